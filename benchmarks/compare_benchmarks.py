@@ -0,0 +1,57 @@
+import argparse
+import json
+
+# Fields that name the entries of a list instead of being compared
+NAME_KEYS = ("benchmark", "board", "engine", "agent_a", "agent_b", "depth")
+
+
+def flatten(value, prefix: str = "") -> dict:
+    """Numeric fields of a report keyed by their path, e.g. "search.native.depth=3.mean_ms"."""
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {prefix: value}
+    if isinstance(value, list):
+        fields = {}
+        for item in value:
+            # Entries of a list are named by their identifying fields
+            names = [
+                f"{key}={item[key]}" if key == "depth" else str(item[key])
+                for key in NAME_KEYS
+                if isinstance(item, dict) and key in item
+            ]
+            fields.update(flatten(item, ".".join([prefix, *names]).strip(".")))
+        return fields
+    if isinstance(value, dict):
+        fields = {}
+        for key, item in value.items():
+            if key in NAME_KEYS or key == "seed":
+                continue
+            fields.update(flatten(item, f"{prefix}.{key}".strip(".")))
+        return fields
+    return {}
+
+
+def compare_reports(old: dict, new: dict) -> list[tuple[str, float, float, float]]:
+    """(field, old value, new value, new / old) of every field present in both reports."""
+    old_fields = flatten(old["results"])
+    new_fields = flatten(new["results"])
+    return [
+        (field, old_fields[field], new_fields[field], new_fields[field] / old_fields[field])
+        for field in old_fields
+        if field in new_fields and old_fields[field] != 0
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two run_benchmarks reports")
+    parser.add_argument("old", help="report of the reference branch")
+    parser.add_argument("new", help="report of the branch to compare")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    for field, old_value, new_value, ratio in compare_reports(old, new):
+        print(f"{field:<60} {old_value:>14.4g} {new_value:>14.4g} {ratio:>8.3f}x")
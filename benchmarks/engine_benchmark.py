@@ -0,0 +1,56 @@
+import argparse
+import json
+import time
+
+from benchmarks.score_benchmark import random_positions
+
+
+def time_moves(function, positions: list, columns: list, repeat: int) -> float:
+    """Average time of one call in nanoseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for game, column in zip(positions, columns):
+            function(game, column)
+    return (time.perf_counter() - start) / (repeat * len(positions)) * 1e9
+
+
+def run_engine_benchmark(count: int = 10000, repeat: int = 20, seed: int = 0) -> dict:
+    positions = [
+        game for game in random_positions(count, seed) if not game.is_game_over()
+    ]
+    columns = [
+        game.get_available_columns(game.get_current_player())[0] for game in positions
+    ]
+
+    copy = time_moves(lambda game, column: game.copy(), positions, columns, repeat)
+    copy_make_move = time_moves(
+        lambda game, column: game.copy().make_move(column, 1), positions, columns, repeat
+    )
+    get_score = time_moves(
+        lambda game, column: game.get_score(0), positions, columns, repeat
+    )
+    available_columns = time_moves(
+        lambda game, column: game.get_available_columns(0), positions, columns, repeat
+    )
+    position_key = time_moves(
+        lambda game, column: game.encode_position_key(), positions, columns, repeat
+    )
+    return {
+        "benchmark": "engine",
+        "positions": len(positions),
+        "copy_ns": copy,
+        "copy_make_move_ns": copy_make_move,
+        "make_move_ns": copy_make_move - copy,
+        "get_score_ns": get_score,
+        "get_available_columns_ns": available_columns,
+        "encode_position_key_ns": position_key,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of the engine operations")
+    parser.add_argument("--positions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run_engine_benchmark(args.positions, args.repeat, args.seed)))
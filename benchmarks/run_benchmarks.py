@@ -0,0 +1,59 @@
+import subprocess
+import platform
+import argparse
+import json
+import time
+import sys
+
+from benchmarks.selfplay_benchmark import run_selfplay_benchmark
+from benchmarks.scaling_benchmark import run_scaling_benchmark
+from benchmarks.search_benchmark import run_search_benchmark
+from benchmarks.engine_benchmark import run_engine_benchmark
+from benchmarks.score_benchmark import run_score_benchmark
+from benchmarks.tt_benchmark import run_tt_benchmark
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(seed: int = 0, quick: bool = False) -> dict:
+    """Every benchmark with its fixed seed, `quick` runs smaller sizes for a smoke test."""
+    scale = 10 if quick else 1
+    results = [
+        run_score_benchmark(10000 // scale, 20 // scale, seed),
+        run_engine_benchmark(10000 // scale, 20 // scale, seed),
+        run_search_benchmark(10, 4 if quick else 6, 2 if quick else 3, seed),
+        run_tt_benchmark(50 // scale, 2, seed),
+        run_selfplay_benchmark(200 // scale, seed),
+        run_scaling_benchmark(20 // scale, 20 // scale, 2, 3, 2000 // scale, seed),
+    ]
+    return {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "quick": quick,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every benchmark")
+    parser.add_argument("-o", "--output", help="JSON file for the results")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="smaller sizes")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.seed, args.quick)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,146 @@
+import tracemalloc
+import statistics
+import argparse
+import json
+import sys
+import time
+
+import knucklebones_rust as kb
+
+from benchmarks.score_benchmark import random_positions
+from benchmarks.engine_benchmark import time_moves
+from src.negamax import get_best_move
+
+# (columns, rows, dice faces), from the standard game to 5x5 boards with a d12
+BOARD_SIZES = ((3, 3, 6), (4, 4, 6), (4, 4, 8), (5, 5, 8), (5, 5, 10), (5, 5, 12))
+
+
+def time_native_search(positions: list, depth: int, dice_samples: int | None) -> dict:
+    """Latency of the native search, each position with an empty table, and the number
+    of entries it leaves in the table."""
+    times = []
+    nodes = 0
+    entries = 0
+    for game in positions:
+        table = kb.SearchTable()
+        start = time.perf_counter()
+        _, _, visited = game.best_move(depth, table, dice_samples=dice_samples)
+        times.append(time.perf_counter() - start)
+        nodes += visited
+        entries += len(table)
+
+    return {
+        "mean_ms": statistics.mean(times) * 1000,
+        "max_ms": max(times) * 1000,
+        "nodes_per_second": nodes / sum(times),
+        "table_entries": entries / len(positions),
+    }
+
+
+def python_table_memory(positions: list, depth: int, dice_samples: int | None) -> dict:
+    """Memory kept by the table of the Python search, in bytes per entry."""
+    tracemalloc.start()
+    total_bytes = 0
+    entries = 0
+    for game in positions:
+        before = tracemalloc.get_traced_memory()[0]
+        tt = {}
+        get_best_move(game, depth, tt, dice_samples=dice_samples)
+        total_bytes += tracemalloc.get_traced_memory()[0] - before
+        entries += len(tt)
+        del tt
+    tracemalloc.stop()
+    return {
+        "table_entries": entries / len(positions),
+        "bytes_per_entry": total_bytes / entries,
+    }
+
+
+def run_scaling_benchmark(
+    count: int = 20,
+    repeat: int = 20,
+    depth: int = 2,
+    dice_samples: int = 3,
+    playouts: int = 2000,
+    seed: int = 0,
+) -> dict:
+    """Throughput and memory of the engine and the searches for each board size.
+
+    The native search is timed on every dice value and on `dice_samples` of them, the
+    Python table is measured at depth 1 with the same sampling.
+    """
+    results = []
+    for columns_number, rows_number, max_dice_value in BOARD_SIZES:
+        dimensions = (columns_number, rows_number, max_dice_value)
+        positions = [
+            game
+            for game in random_positions(count, seed, *dimensions)
+            if not game.is_game_over()
+        ]
+        columns = [
+            game.get_available_columns(game.get_current_player())[0]
+            for game in positions
+        ]
+
+        copy = time_moves(lambda game, column: game.copy(), positions, columns, repeat)
+        copy_make_move = time_moves(
+            lambda game, column: game.copy().make_move(column, 1),
+            positions,
+            columns,
+            repeat,
+        )
+        position_key = time_moves(
+            lambda game, column: game.encode_position_key(), positions, columns, repeat
+        )
+        encode_game = time_moves(
+            lambda game, column: game.encode_game(), positions, columns, repeat
+        )
+
+        game = kb.Knucklebones(*dimensions, seed)
+        start = time.perf_counter()
+        game.random_playouts(playouts, seed)
+        playout_time = time.perf_counter() - start
+
+        results.append(
+            {
+                "board": f"{columns_number}x{rows_number}d{max_dice_value}",
+                "positions": len(positions),
+                "game_bytes": sys.getsizeof(game),
+                "make_move_ns": copy_make_move - copy,
+                "encode_position_key_ns": position_key,
+                "encode_game_ns": encode_game,
+                "playouts_per_second": playouts / playout_time,
+                "native": time_native_search(positions, depth, None),
+                "native_sampled": time_native_search(positions, depth, dice_samples),
+                "python_table": python_table_memory(positions, 1, dice_samples),
+            }
+        )
+    return {
+        "benchmark": "scaling",
+        "depth": depth,
+        "dice_samples": dice_samples,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and memory per board size")
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--dice-samples", type=int, default=3)
+    parser.add_argument("--playouts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            run_scaling_benchmark(
+                args.positions,
+                args.repeat,
+                args.depth,
+                args.dice_samples,
+                args.playouts,
+                args.seed,
+            )
+        )
+    )
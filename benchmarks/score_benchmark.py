@@ -0,0 +1,68 @@
+import argparse
+import random
+import json
+import time
+
+import knucklebones_rust as kb
+
+
+def random_positions(
+    count: int,
+    seed: int,
+    columns_number: int = 3,
+    rows_number: int = 3,
+    max_dice_value: int = 6,
+) -> list:
+    """Positions reached by random play, one per game, from a fixed seed."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = kb.Knucklebones(
+            columns_number, rows_number, max_dice_value, rng.getrandbits(64)
+        )
+        for _ in range(rng.randint(0, 20)):
+            if game.is_game_over():
+                break
+            game.make_move(rng.choice(game.get_available_columns(game.get_current_player())))
+        positions.append(game)
+    return positions
+
+
+def time_calls(function, positions: list, repeat: int) -> float:
+    """Average time of one call in nanoseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for game in positions:
+            function(game, 0)
+            function(game, 1)
+    return (time.perf_counter() - start) / (repeat * len(positions) * 2) * 1e9
+
+
+def run_score_benchmark(count: int = 10000, repeat: int = 20, seed: int = 0) -> dict:
+    positions = random_positions(count, seed)
+    for game in positions:
+        for player_index in range(2):
+            assert game.get_score(player_index) == game.compute_score(player_index)
+
+    recomputed = time_calls(lambda game, player: game.compute_score(player), positions, repeat)
+    cached = time_calls(lambda game, player: game.get_score(player), positions, repeat)
+    heuristic = time_calls(
+        lambda game, player: game.get_heuristic_score(player), positions, repeat
+    )
+    return {
+        "benchmark": "score",
+        "positions": count,
+        "compute_score_ns": recomputed,
+        "get_score_ns": cached,
+        "get_heuristic_score_ns": heuristic,
+        "speedup": recomputed / cached,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached against recomputed scores")
+    parser.add_argument("--positions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run_score_benchmark(args.positions, args.repeat, args.seed)))
@@ -0,0 +1,74 @@
+import statistics
+import argparse
+import json
+import time
+
+from benchmarks.score_benchmark import random_positions
+from src.search_stats import SearchStats
+from src.negamax import get_best_move
+
+
+def search_corpus(count: int, seed: int) -> list:
+    """Standard positions of the search benchmark, the games that are not over."""
+    return [game for game in random_positions(count, seed) if not game.is_game_over()]
+
+
+def time_search(positions: list, depth: int, engine: str) -> dict:
+    """Latency of one search per position, each one with an empty table.
+
+    The "parallel" engine is the native search on every core.
+    """
+    times = []
+    nodes = 0
+    for game in positions:
+        start = time.perf_counter()
+        if engine == "native":
+            _, _, visited = game.best_move(depth)
+        elif engine == "parallel":
+            _, _, visited = game.best_move(depth, threads=0)
+        else:
+            stats = SearchStats()
+            get_best_move(game, depth, {}, stats=stats)
+            visited = stats.total_nodes()
+        times.append(time.perf_counter() - start)
+        nodes += visited
+
+    return {
+        "engine": engine,
+        "depth": depth,
+        "mean_ms": statistics.mean(times) * 1000,
+        "median_ms": statistics.median(times) * 1000,
+        "max_ms": max(times) * 1000,
+        "nodes": nodes,
+        "nodes_per_second": nodes / sum(times),
+    }
+
+
+def run_search_benchmark(
+    count: int = 10, max_depth: int = 6, python_max_depth: int = 3, seed: int = 0
+) -> dict:
+    positions = search_corpus(count, seed)
+    results = []
+    for depth in range(1, max_depth + 1):
+        results.append(time_search(positions, depth, "native"))
+        results.append(time_search(positions, depth, "parallel"))
+        # The Python reference is too slow for the deepest searches
+        if depth <= python_max_depth:
+            results.append(time_search(positions, depth, "python"))
+    return {"benchmark": "search", "positions": len(positions), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search latency per depth")
+    parser.add_argument("--positions", type=int, default=10)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--python-max-depth", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            run_search_benchmark(
+                args.positions, args.max_depth, args.python_max_depth, args.seed
+            )
+        )
+    )
@@ -0,0 +1,37 @@
+import argparse
+import json
+import time
+
+from src.tournament import play_game
+
+MATCHES = (("random", "random"), ("negamax:1", "negamax:1"), ("negamax:2", "random"))
+
+
+def run_selfplay_benchmark(games: int = 200, seed: int = 0) -> dict:
+    """Full games per second on one core, with the same seeds as the tournaments."""
+    results = []
+    for agent_a, agent_b in MATCHES:
+        turns = 0
+        start = time.perf_counter()
+        for game_index in range(games):
+            result = play_game(agent_a, agent_b, game_index, (seed << 32) + game_index)
+            turns += result["turns"]
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "agent_a": agent_a,
+                "agent_b": agent_b,
+                "games": games,
+                "games_per_second": games / elapsed,
+                "turns_per_second": turns / elapsed,
+            }
+        )
+    return {"benchmark": "selfplay", "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-play games per second")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run_selfplay_benchmark(args.games, args.seed)))
@@ -0,0 +1,57 @@
+import tempfile
+import argparse
+import json
+import time
+import os
+
+from benchmarks.search_benchmark import search_corpus
+from src.transposition import TranspositionTable
+from src.negamax import get_best_move
+from src.tt_storage import TTFile
+
+
+def run_tt_benchmark(count: int = 50, depth: int = 2, seed: int = 0) -> dict:
+    """Fill a table with searches on the standard positions, then time its file."""
+    tt = TranspositionTable()
+    for game in search_corpus(count, seed):
+        get_best_move(game, depth, tt)
+    entries = list(tt.items())
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "tt.bin")
+
+        start = time.perf_counter()
+        tt_file = TTFile(filename, 3, 3, 6)
+        tt_file.append(entries)
+        tt_file.compact()
+        save_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tt_file = TTFile(filename, 3, 3, 6)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for key, _ in entries:
+            tt_file.get(key)
+        lookup_time = time.perf_counter() - start
+
+        file_size = os.path.getsize(filename)
+
+    return {
+        "benchmark": "tt",
+        "entries": len(entries),
+        "save_ms": save_time * 1000,
+        "load_ms": load_time * 1000,
+        "lookup_ns": lookup_time / max(len(entries), 1) * 1e9,
+        "file_bytes": file_size,
+        "bytes_per_entry": file_size / max(len(entries), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transposition table file save and load")
+    parser.add_argument("--positions", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run_tt_benchmark(args.positions, args.depth, args.seed)))
@@ -1,58 +1,354 @@
 #[pyo3::pymodule]
 mod knucklebones_rust {
+    use numpy::ndarray::Array2;
+    use numpy::{
+        IntoPyArray, PyArray1, PyArray2, PyArray4, PyArrayMethods, PyReadonlyArray1,
+    };
+    use pyo3::exceptions::{PyBufferError, PyTimeoutError, PyValueError};
+    use std::sync::atomic::{AtomicUsize, Ordering};
+    use std::os::raw::{c_char, c_int, c_void};
+    use std::time::{Duration, Instant};
+    use std::collections::HashMap;
+    use std::sync::Mutex;
+    use std::fmt::Write;
     use pyo3::prelude::*;
     use rand::prelude::*;
-    use std::collections::HashMap;
+    use pyo3::ffi;
+
+    // Zobrist keys are derived on the fly from the feature index with splitmix64,
+    // so no random table has to be stored or shared between copies
+    const ZOBRIST_SIDE_INDEX: u64 = u64::MAX;
+    const ZOBRIST_DICE_OFFSET: u64 = 1 << 62;
+
+    fn splitmix64(x: u64) -> u64 {
+        let mut z = x.wrapping_add(0x9E37_79B9_7F4A_7C15);
+        z = (z ^ (z >> 30)).wrapping_mul(0xBF58_476D_1CE4_E5B9);
+        z = (z ^ (z >> 27)).wrapping_mul(0x94D0_49BB_1331_11EB);
+        z ^ (z >> 31)
+    }
+
+    // Small splitmix64 generator, each game owns one so that games can be replayed from a seed
+    #[derive(Clone, Copy)]
+    struct DiceRng {
+        state: u64,
+    }
+
+    impl DiceRng {
+        fn new(seed: u64) -> Self {
+            Self { state: seed }
+        }
+
+        // Uniform value between 1 and max_value
+        fn roll(&mut self, max_value: u8) -> u8 {
+            let random = splitmix64(self.state);
+            self.state = self.state.wrapping_add(0x9E37_79B9_7F4A_7C15);
+            (((random >> 32) * max_value as u64) >> 32) as u8 + 1
+        }
+    }
+
+    // Number of bits needed to store a value between 0 and max_value
+    fn bits_for(max_value: u8) -> u32 {
+        u8::BITS - max_value.leading_zeros()
+    }
+
+    // Put a value in the first empty cell of a column, false if the column is full
+    fn place_in_column(column: &mut [u8], value: u8) -> bool {
+        for cell in column.iter_mut() {
+            if *cell == 0 {
+                *cell = value;
+                return true;
+            }
+        }
+        false
+    }
+
+    // Remove every occurrence of a value from a column, returns the number of removed dice
+    fn remove_from_column(column: &mut [u8], value: u8) -> usize {
+        let mut removed = 0;
+        for cell in column.iter_mut() {
+            if *cell == value {
+                *cell = 0;
+                removed += 1;
+            }
+        }
+        removed
+    }
 
+    // Same rule as get_score: each die counts for its value times the number of equal dice
+    fn column_score(column: &[u8]) -> usize {
+        let mut score = 0;
+        for &value in column {
+            if value != 0 {
+                let count = column.iter().filter(|&&other| other == value).count();
+                score += value as usize * count;
+            }
+        }
+        score
+    }
+
+    // Largest board of the fixed-size layout, 3 bits per cell still fit a 3x3 game key in 64 bits
+    const MAX_COLUMNS: usize = 8;
+    const MAX_CELLS: usize = 64;
+
+    // Transposition table flags, same meaning as in src/negamax.py
+    const EXACT: u8 = 0;
+    const LOWERBOUND: u8 = 1;
+    const UPPERBOUND: u8 = 2;
+
+    #[derive(Clone, Copy)]
+    struct SearchEntry {
+        value: f64,
+        flag: u8,
+        depth: usize,
+    }
+
+    // Same names as ALGORITHMS in src/negamax.py
+    #[derive(Clone, Copy, PartialEq)]
+    enum Algorithm {
+        Negamax,
+        Expectimax,
+        Star1,
+        Star2,
+    }
+
+    impl Algorithm {
+        fn from_name(name: &str) -> PyResult<Self> {
+            match name {
+                "negamax" => Ok(Algorithm::Negamax),
+                "expectimax" => Ok(Algorithm::Expectimax),
+                "star1" => Ok(Algorithm::Star1),
+                "star2" => Ok(Algorithm::Star2),
+                _ => Err(PyValueError::new_err(format!(
+                    "Unknown algorithm '{}', expected negamax, expectimax, star1 or star2",
+                    name
+                ))),
+            }
+        }
+    }
+
+    // State shared by every node of one search
+    struct Search<'a> {
+        tt: &'a mut HashMap<u64, SearchEntry>,
+        // Set for the workers of a parallel search: they store their entries in the shared table
+        // and read the table of the caller without changing it, tt is not used
+        shared: Option<(&'a SharedTable, &'a HashMap<u64, SearchEntry>)>,
+        nodes: u64,
+        deadline: Option<Instant>,
+        algorithm: Algorithm,
+        threads: usize,
+        // Number of dice values searched at the chance nodes, None for all of them
+        dice_samples: Option<usize>,
+        // Set when a leaf is cut off by the depth before the end of the game
+        horizon: bool,
+        // Cutoffs caused by the moves of the expectimax algorithms, weighted by depth and keyed
+        // by history_key, their columns are searched first in the other nodes
+        history: HashMap<u64, u64>,
+    }
+
+    impl<'a> Search<'a> {
+        fn new(
+            tt: &'a mut HashMap<u64, SearchEntry>,
+            deadline: Option<Instant>,
+            algorithm: Algorithm,
+        ) -> Self {
+            Self {
+                tt: tt,
+                shared: None,
+                nodes: 0,
+                deadline: deadline,
+                algorithm: algorithm,
+                threads: 1,
+                dice_samples: None,
+                horizon: false,
+                history: HashMap::new(),
+            }
+        }
+
+        fn probe(&self, key: u64) -> Option<SearchEntry> {
+            match self.shared {
+                Some((shared, base)) => shared.get(key).or_else(|| base.get(&key).copied()),
+                None => self.tt.get(&key).copied(),
+            }
+        }
+
+        fn store(&mut self, key: u64, entry: SearchEntry) {
+            match self.shared {
+                Some((shared, _)) => shared.insert(key, entry),
+                None => {
+                    self.tt.insert(key, entry);
+                }
+            }
+        }
+    }
+
+    // Transposition table of the workers of a parallel search, split in shards behind their own
+    // lock so that the workers rarely wait for each other
+    struct SharedTable {
+        shards: Vec<Mutex<HashMap<u64, SearchEntry>>>,
+    }
+
+    impl SharedTable {
+        fn new(shards_number: usize) -> Self {
+            Self {
+                shards: (0..shards_number).map(|_| Mutex::new(HashMap::new())).collect(),
+            }
+        }
+
+        fn shard(&self, key: u64) -> &Mutex<HashMap<u64, SearchEntry>> {
+            &self.shards[(splitmix64(key) % self.shards.len() as u64) as usize]
+        }
+
+        fn get(&self, key: u64) -> Option<SearchEntry> {
+            self.shard(key).lock().unwrap().get(&key).copied()
+        }
+
+        fn insert(&self, key: u64, entry: SearchEntry) {
+            self.shard(key).lock().unwrap().insert(key, entry);
+        }
+    }
+
+    // dice_samples of best_move, at least one dice value must be searched
+    fn check_dice_samples(dice_samples: Option<usize>) -> PyResult<()> {
+        if dice_samples == Some(0) {
+            return Err(PyValueError::new_err("dice_samples must be at least 1"));
+        }
+        Ok(())
+    }
+
+    // Number of search threads, 0 means one per available core
+    fn thread_count(threads: usize) -> usize {
+        if threads > 0 {
+            return threads;
+        }
+        std::thread::available_parallelism().map_or(1, |count| count.get())
+    }
+
+    // Transposition table of the native search, can be kept between calls to best_move
     #[pyclass]
+    struct SearchTable {
+        entries: HashMap<u64, SearchEntry>,
+    }
+
+    #[pymethods]
+    impl SearchTable {
+        #[new]
+        fn new() -> Self {
+            Self {
+                entries: HashMap::new(),
+            }
+        }
+
+        fn clear(&mut self) {
+            self.entries.clear();
+        }
+
+        fn __len__(&self) -> usize {
+            self.entries.len()
+        }
+    }
+
+    #[pyclass]
+    #[derive(Clone, Copy)]
     struct Knucklebones {
-        boards: Vec<Board>,
+        boards: [Board; 2],
         columns_number: usize,
         rows_number: usize,
         max_dice_value: u8,
         dice_value: u8,
         current_player: usize,
         max_number_of_elements: usize,
+        hash: u64,
+        rng: DiceRng,
+        // Shape and strides (in bytes) of the (players, columns, rows) buffer view
+        view_shape: [isize; 3],
+        view_strides: [isize; 3],
     }
 
     #[pyclass]
-    #[derive(Clone)]
+    #[derive(Clone, Copy)]
     struct Board {
-        board: Vec<Vec<u8>>,
+        // Cells stored column after column, the cell (column, row) is at column * rows_number + row
+        // The arrays have a fixed size so that copying a game is a single memcpy
+        cells: [u8; MAX_CELLS],
+        columns_number: usize,
+        rows_number: usize,
         number_of_elements: usize,
+        // Score of every column and of the whole board, updated on each change
+        column_scores: [usize; MAX_COLUMNS],
+        score: usize,
     }
 
     #[pymethods]
     impl Board {
         #[new]
-        fn new(columns_number: usize, rows_number: usize) -> Self {
-            Self {
-                board: vec![vec![0; rows_number]; columns_number],
-                number_of_elements: 0,
+        fn new(columns_number: usize, rows_number: usize) -> PyResult<Self> {
+            if columns_number > MAX_COLUMNS || columns_number * rows_number > MAX_CELLS {
+                return Err(PyValueError::new_err(format!(
+                    "A board has at most {} columns and {} cells, got {}x{}",
+                    MAX_COLUMNS, MAX_CELLS, columns_number, rows_number
+                )));
             }
+            Ok(Self {
+                cells: [0; MAX_CELLS],
+                columns_number: columns_number,
+                rows_number: rows_number,
+                number_of_elements: 0,
+                column_scores: [0; MAX_COLUMNS],
+                score: 0,
+            })
         }
 
         fn get_board(&self) -> Vec<Vec<u8>> {
-            self.board.clone()
+            (0..self.columns_number)
+                .map(|column| self.column(column).to_vec())
+                .collect()
+        }
+    }
+
+    impl Board {
+        fn column(&self, column: usize) -> &[u8] {
+            let start = column * self.rows_number;
+            &self.cells[start..start + self.rows_number]
+        }
+
+        fn column_mut(&mut self, column: usize) -> &mut [u8] {
+            let start = column * self.rows_number;
+            &mut self.cells[start..start + self.rows_number]
+        }
+
+        fn update_column_score(&mut self, column: usize) {
+            let column_score = column_score(self.column(column));
+            self.score = self.score - self.column_scores[column] + column_score;
+            self.column_scores[column] = column_score;
         }
     }
 
     #[pymethods]
     impl Knucklebones {
         #[new]
-        fn new(columns_number: usize, rows_number: usize, max_dice_value: u8) -> Self {
-            Self {
-                boards: vec![
-                    Board::new(columns_number, rows_number),
-                    Board::new(columns_number, rows_number),
-                ],
+        #[pyo3(signature = (columns_number, rows_number, max_dice_value, seed=None))]
+        fn new(
+            columns_number: usize,
+            rows_number: usize,
+            max_dice_value: u8,
+            seed: Option<u64>,
+        ) -> PyResult<Self> {
+            let board = Board::new(columns_number, rows_number)?;
+            let mut rng = DiceRng::new(seed.unwrap_or_else(|| rand::rng().random()));
+            let dice_value = rng.roll(max_dice_value);
+            Ok(Self {
+                boards: [board, board],
                 columns_number: columns_number,
                 rows_number: rows_number,
                 max_dice_value: max_dice_value,
-                dice_value: rand::rng().random_range(1..=max_dice_value),
+                dice_value: dice_value,
                 current_player: 0,
                 max_number_of_elements: columns_number * rows_number,
-            }
+                hash: splitmix64(ZOBRIST_DICE_OFFSET + dice_value as u64),
+                rng: rng,
+                view_shape: [2, columns_number as isize, rows_number as isize],
+                view_strides: [std::mem::size_of::<Board>() as isize, rows_number as isize, 1],
+            })
         }
 
         fn add_value_to_column(
@@ -61,16 +357,19 @@ mod knucklebones_rust {
             player_index: usize,
             value: u8,
         ) -> PyResult<bool> {
-            let player_board = &mut self.boards[player_index].board;
-            let column = &mut player_board[board_index];
-            for i in 0..self.rows_number {
-                if column[i] == 0 {
-                    column[i] = value;
-                    self.boards[player_index].number_of_elements += 1;
-                    return Ok(true);
-                }
+            if board_index >= self.columns_number {
+                return Ok(false);
             }
-            return Ok(false);
+            let board = &mut self.boards[player_index];
+            let row = match board.column(board_index).iter().position(|&x| x == 0) {
+                Some(row) => row,
+                None => return Ok(false),
+            };
+            board.column_mut(board_index)[row] = value;
+            board.number_of_elements += 1;
+            board.update_column_score(board_index);
+            self.hash ^= self.zobrist_cell(player_index, board_index, row, value);
+            return Ok(true);
         }
 
         fn remove_value_from_column(
@@ -79,22 +378,44 @@ mod knucklebones_rust {
             player_index: usize,
             value: u8,
         ) -> PyResult<bool> {
-            let player_board = &mut self.boards[player_index];
-            let column = &mut player_board.board[board_index];
+            if board_index >= self.columns_number {
+                return Ok(false);
+            }
             let mut found = false;
             for i in 0..self.rows_number {
-                if column[i] == value {
-                    column[i] = 0;
-                    player_board.number_of_elements -= 1;
+                if self.boards[player_index].column(board_index)[i] == value {
+                    self.boards[player_index].column_mut(board_index)[i] = 0;
+                    self.boards[player_index].number_of_elements -= 1;
+                    self.hash ^= self.zobrist_cell(player_index, board_index, i, value);
                     found = true;
                 }
             }
+            if found {
+                self.boards[player_index].update_column_score(board_index);
+            }
             return Ok(found);
         }
 
-        fn make_move(&mut self, board_index: usize) -> PyResult<bool> {
+        #[pyo3(signature = (board_index, next_dice_value=None))]
+        fn make_move(&mut self, board_index: usize, next_dice_value: Option<u8>) -> PyResult<bool> {
+            if !self.place_dice(board_index)? {
+                return Ok(false);
+            }
+
+            // Use the given dice value for the next player or roll the dice again
+            let next_dice_value = match next_dice_value {
+                Some(dice_value) => dice_value,
+                None => self.rng.roll(self.max_dice_value),
+            };
+            self.set_dice_value(next_dice_value);
+
+            return Ok(true);
+        }
+
+        // make_move without rolling the dice, the search sets the dice itself
+        fn place_dice(&mut self, board_index: usize) -> PyResult<bool> {
             // Check if the board index is valid
-            if board_index >= self.boards[self.current_player].board.len() {
+            if board_index >= self.columns_number {
                 return Ok(false);
             }
 
@@ -117,26 +438,28 @@ mod knucklebones_rust {
                 self.dice_value,
             )?;
 
-            // Switch to the other player and roll the dice again
+            // Switch to the other player, the dice is left as it is
             self.current_player = self.get_other_player(self.current_player);
-            self.dice_value = rand::rng().random_range(1..=self.max_dice_value);
+            self.hash ^= splitmix64(ZOBRIST_SIDE_INDEX);
 
             return Ok(true);
         }
 
         fn get_score(&self, player_index: usize) -> usize {
+            self.boards[player_index].score
+        }
+
+        // Score recomputed from the cells, the reference for the cached get_score
+        fn compute_score(&self, player_index: usize) -> usize {
             // The score is the sum of the values in the board
             // If a value is repeated in a column, the total is multiplied by the number of repetitions
             // e.g. if the column has the values 6, 6, 5 the score is (6+6)*2 + 5 = 29
-            let board = &self.boards[player_index].board;
+            let board = &self.boards[player_index];
             let mut score: usize = 0;
             for column in 0..self.columns_number {
                 let mut value_dict = HashMap::new();
-                for row in 0..self.rows_number {
-                    value_dict.insert(
-                        board[column][row],
-                        value_dict.get(&board[column][row]).unwrap_or(&0) + 1,
-                    );
+                for &value in board.column(column) {
+                    value_dict.insert(value, value_dict.get(&value).unwrap_or(&0) + 1);
                 }
                 for (value, count) in value_dict {
                     score += value as usize * count * count;
@@ -145,6 +468,23 @@ mod knucklebones_rust {
             return score;
         }
 
+        fn get_max_dice_value(&self) -> u8 {
+            self.max_dice_value
+        }
+
+        // Highest possible score of a board, every column full of the highest dice value
+        fn get_max_score(&self) -> usize {
+            let max_dice_value = self.max_dice_value as usize;
+            self.columns_number * self.rows_number * self.rows_number * max_dice_value
+        }
+
+        // Largest change of the score difference in one move: the die completes a column of
+        // equal dice and removes a full column of them from the other board
+        fn get_max_score_change(&self) -> usize {
+            let max_dice_value = self.max_dice_value as usize;
+            (2 * self.rows_number - 1) * max_dice_value + self.rows_number * self.rows_number * max_dice_value
+        }
+
         fn get_heuristic_score(&self, player_index: usize) -> i64 {
             let player_score = self.get_score(player_index) as i64;
             let other_score = self.get_score(self.get_other_player(player_index)) as i64;
@@ -172,12 +512,24 @@ mod knucklebones_rust {
             self.current_player
         }
 
+        // Restart the dice rolls from a seed, the current dice is kept
+        fn set_seed(&mut self, seed: u64) {
+            self.rng = DiceRng::new(seed);
+        }
+
+        fn set_current_player(&mut self, player_index: usize) {
+            if player_index != self.current_player {
+                self.current_player = player_index;
+                self.hash ^= splitmix64(ZOBRIST_SIDE_INDEX);
+            }
+        }
+
         fn get_dice_value(&self) -> u8 {
             self.dice_value
         }
 
         fn get_boards(&self) -> Vec<Board> {
-            self.boards.clone()
+            self.boards.to_vec()
         }
 
         fn get_number_of_elements(&self, player_index: usize) -> usize {
@@ -185,15 +537,18 @@ mod knucklebones_rust {
         }
 
         fn set_dice_value(&mut self, dice_value: u8) {
+            self.hash ^= splitmix64(ZOBRIST_DICE_OFFSET + self.dice_value as u64);
             self.dice_value = dice_value;
+            self.hash ^= splitmix64(ZOBRIST_DICE_OFFSET + self.dice_value as u64);
         }
 
         fn display_board(&self, player_index: usize) -> String {
-            let board = &self.boards[player_index].board;
+            let board = &self.boards[player_index];
             let mut result = String::new();
             for row in 0..self.rows_number {
                 for column in 0..self.columns_number {
-                    result.push_str(&board[column][self.rows_number - row - 1].to_string());
+                    let value = board.column(column)[self.rows_number - row - 1];
+                    result.push_str(&value.to_string());
                     result.push_str(" ");
                 }
                 result.push_str("\n");
@@ -202,7 +557,8 @@ mod knucklebones_rust {
         }
 
         fn is_column_full(&self, column: usize, player_index: usize) -> bool {
-            self.boards[player_index].board[column]
+            self.boards[player_index]
+                .column(column)
                 .iter()
                 .all(|&x| x != 0)
         }
@@ -217,54 +573,1111 @@ mod knucklebones_rust {
             available_columns
         }
 
+        // Bit c is set when the column c of the player is not full
+        fn get_free_columns_mask(&self, player_index: usize) -> u64 {
+            let board = &self.boards[player_index];
+            let mut mask = 0;
+            for column in 0..self.columns_number {
+                if board.column(column).contains(&0) {
+                    mask |= 1 << column;
+                }
+            }
+            mask
+        }
+
         // Possible moves for the current player
         // Combinations of columns that can be used x possible dice values
+        // The columns do not depend on the dice, get_free_columns_mask is the cheaper version
         fn get_possible_moves(&self) -> Vec<(u8, Vec<usize>)> {
-            let mut possible_moves = HashMap::new();
-            for column in 0..self.columns_number {
-                if self.is_column_full(column, self.current_player) {
-                    continue;
+            let columns = self.get_available_columns(self.current_player);
+            if columns.is_empty() {
+                return Vec::new();
+            }
+            (1..=self.max_dice_value)
+                .map(|dice_value| (dice_value, columns.clone()))
+                .collect()
+        }
+
+        // Play a column with a given dice value in place, without rolling the next dice
+        // Returns the token that undo needs to take the move back, so that a search can walk
+        // the tree on one game instead of copying it for every child
+        // The token packs the previous dice value (bits 0-7), the column (8-15), the row of the
+        // placed die (16-23) and the rows of the dice removed from the other board (24-63)
+        fn play(&mut self, column: usize, dice_value: u8) -> PyResult<u64> {
+            if self.rows_number > 40 {
+                return Err(PyValueError::new_err("play supports at most 40 rows"));
+            }
+            if column >= self.columns_number {
+                return Err(PyValueError::new_err(format!("Column {} does not exist", column)));
+            }
+            let player = self.current_player;
+            let row = match self.boards[player].column(column).iter().position(|&x| x == 0) {
+                Some(row) => row,
+                None => return Err(PyValueError::new_err(format!("Column {} is full", column))),
+            };
+            let other_column = self.boards[self.get_other_player(player)].column(column);
+            let mut removed: u64 = 0;
+            for (other_row, &value) in other_column.iter().enumerate() {
+                if value == dice_value {
+                    removed |= 1 << other_row;
                 }
-                for dice_value in 1..=self.max_dice_value {
-                    possible_moves
-                        .entry(dice_value)
-                        .or_insert(Vec::new())
-                        .push(column);
+            }
+
+            let previous_dice_value = self.dice_value;
+            self.set_dice_value(dice_value);
+            self.place_dice(column)?;
+            Ok(previous_dice_value as u64
+                | (column as u64) << 8
+                | (row as u64) << 16
+                | removed << 24)
+        }
+
+        // Take back the move of a token returned by play
+        fn undo(&mut self, token: u64) {
+            let column = (token >> 8 & 0xFF) as usize;
+            let row = (token >> 16 & 0xFF) as usize;
+            self.set_current_player(self.get_other_player(self.current_player));
+            let player = self.current_player;
+            let other = self.get_other_player(player);
+
+            let dice_value = self.boards[player].column(column)[row];
+            self.boards[player].column_mut(column)[row] = 0;
+            self.boards[player].number_of_elements -= 1;
+            self.boards[player].update_column_score(column);
+            self.hash ^= self.zobrist_cell(player, column, row, dice_value);
+
+            let removed = token >> 24;
+            if removed != 0 {
+                for other_row in 0..self.rows_number {
+                    if removed >> other_row & 1 == 1 {
+                        self.boards[other].column_mut(column)[other_row] = dice_value;
+                        self.boards[other].number_of_elements += 1;
+                        self.hash ^= self.zobrist_cell(other, column, other_row, dice_value);
+                    }
                 }
+                self.boards[other].update_column_score(column);
             }
-            let mut possible_moves_vec = possible_moves
-                .into_iter()
-                .collect::<Vec<(u8, Vec<usize>)>>();
-            possible_moves_vec.sort_by_key(|(dice_value, _)| *dice_value);
-            possible_moves_vec
+
+            self.set_dice_value((token & 0xFF) as u8);
         }
 
         fn encode_game(&self) -> String {
-            let mut encoded_game = String::new();
+            // Up to 2 digits and a comma per cell, written without temporary strings
+            let mut encoded_game = String::with_capacity(6 * self.max_number_of_elements + 6);
             for board in &self.boards {
-                for row in &board.board {
-                    for value in row {
-                        encoded_game.push_str(&value.to_string());
-                        encoded_game.push_str(",");
+                for column in 0..self.columns_number {
+                    for value in board.column(column) {
+                        let _ = write!(encoded_game, "{},", value);
                     }
                 }
             }
-            encoded_game.push_str(&self.dice_value.to_string());
-            encoded_game.push_str(",");
-            encoded_game.push_str(&self.current_player.to_string());
+            let _ = write!(encoded_game, "{},{}", self.dice_value, self.current_player);
             encoded_game
         }
 
+        // Packed integer version of encode_game
+        // Each cell, the dice value and the current player are stored as fixed-width bit fields
+        // e.g. on a 3x3 board with a d6, 18 cells * 3 bits + 3 bits + 1 bit = 58 bits
+        fn encode_game_key(&self) -> PyResult<u64> {
+            let order: Vec<usize> = (0..self.columns_number).collect();
+            self.pack_key(&order, false, true)
+        }
+
+        // Same layout as encode_game_key but for the canonical form of the game
+        // The order of the dice inside a column does not change the score (6 6 4 == 6 4 6)
+        // and swapping two columns on both boards at once gives an equivalent position
+        fn encode_canonical_key(&self) -> PyResult<u64> {
+            let order = self.canonical_column_order();
+            self.pack_key(&order, true, true)
+        }
+
+        // Canonical key without the dice value
+        // The value of a search node is an average over every dice roll, so the dice
+        // that happened to be rolled must not split the node into several entries
+        fn encode_position_key(&self) -> PyResult<u64> {
+            let order = self.canonical_column_order();
+            self.pack_key(&order, true, false)
+        }
+
+        // Real column index of each column of the canonical form
+        // The columns are sorted by their (sorted) content, the current player's board first
+        fn canonical_column_order(&self) -> Vec<usize> {
+            let mut order: Vec<usize> = (0..self.columns_number).collect();
+            let current = self.current_player;
+            let other = self.get_other_player(current);
+            order.sort_by_cached_key(|&column| {
+                (
+                    self.sorted_column(current, column),
+                    self.sorted_column(other, column),
+                )
+            });
+            order
+        }
+
+        // Convert a move chosen in the canonical frame back to the real column
+        fn canonical_to_column(&self, canonical_column: usize) -> usize {
+            self.canonical_column_order()[canonical_column]
+        }
+
+        // Convert a real column to its index in the canonical frame
+        fn column_to_canonical(&self, column: usize) -> usize {
+            self.canonical_column_order()
+                .iter()
+                .position(|&c| c == column)
+                .unwrap_or(column)
+        }
+
+        // Native version of get_best_move in src/negamax.py
+        // Returns the best column for the current dice, its value and the number of visited nodes
+        // A table must only be used with one algorithm, their values do not have the same meaning
+        // With threads > 1 (0 for every core) the root moves and the dice values of the reply are
+        // searched in parallel, the GIL is released during the search in every case
+        // With dice_samples only that many dice values, spread over the range, are searched at
+        // each chance node, which caps the branching of large dice; the value is then an estimate
+        // and Star1 / Star2 search every child of the sampled values
+        #[pyo3(signature = (depth, table=None, algorithm="negamax", threads=1, dice_samples=None))]
+        fn best_move(
+            &self,
+            py: Python<'_>,
+            depth: usize,
+            table: Option<PyRefMut<'_, SearchTable>>,
+            algorithm: &str,
+            threads: usize,
+            dice_samples: Option<usize>,
+        ) -> PyResult<(usize, f64, u64)> {
+            let algorithm = Algorithm::from_name(algorithm)?;
+            check_dice_samples(dice_samples)?;
+            let threads = thread_count(threads);
+            let game = *self;
+            match table {
+                Some(mut table) => {
+                    let entries = &mut table.entries;
+                    py.detach(|| {
+                        game.fixed_depth_search(depth, algorithm, threads, dice_samples, entries)
+                    })
+                }
+                None => py.detach(|| {
+                    let entries = &mut HashMap::new();
+                    game.fixed_depth_search(depth, algorithm, threads, dice_samples, entries)
+                }),
+            }
+        }
+
+        // Iterative deepening version of best_move, stops when the time budget (in seconds) runs out
+        // or when a search reaches the end of the game on every leaf
+        // Returns the best column and value of the deepest completed search, the number of visited
+        // nodes and the depth reached
+        #[pyo3(signature = (
+            time_budget, table=None, max_depth=64, algorithm="negamax", threads=1, dice_samples=None
+        ))]
+        fn best_move_timed(
+            &self,
+            py: Python<'_>,
+            time_budget: f64,
+            table: Option<PyRefMut<'_, SearchTable>>,
+            max_depth: usize,
+            algorithm: &str,
+            threads: usize,
+            dice_samples: Option<usize>,
+        ) -> PyResult<(usize, f64, u64, usize)> {
+            let algorithm = Algorithm::from_name(algorithm)?;
+            check_dice_samples(dice_samples)?;
+            let threads = thread_count(threads);
+            let deadline = Instant::now() + Duration::from_secs_f64(time_budget.max(0.0));
+            let game = *self;
+            let search = |entries: &mut HashMap<u64, SearchEntry>| {
+                game.iterative_deepening(
+                    deadline,
+                    max_depth,
+                    algorithm,
+                    threads,
+                    dice_samples,
+                    entries,
+                )
+            };
+            match table {
+                Some(mut table) => {
+                    let entries = &mut table.entries;
+                    py.detach(|| search(entries))
+                }
+                None => py.detach(|| search(&mut HashMap::new())),
+            }
+        }
+
+        // Mean result of games played to the end from this position with random columns and dice,
+        // for the player to move: 1 for a win, 0.5 for a draw and 0 for a loss
+        // The first move uses the current dice, the GIL is released while the games are played
+        #[pyo3(signature = (playouts, seed=None))]
+        fn random_playouts(&self, py: Python<'_>, playouts: usize, seed: Option<u64>) -> f64 {
+            let game = *self;
+            let player = self.current_player;
+            let mut rng = DiceRng::new(seed.unwrap_or_else(|| rand::rng().random()));
+            py.detach(|| {
+                if playouts == 0 {
+                    return 0.5;
+                }
+                let mut total = 0.0;
+                for _ in 0..playouts {
+                    let mut playout = game;
+                    while !playout.is_game_over() {
+                        // Drop the lowest free columns to keep a uniformly drawn one
+                        let mut free = playout.get_free_columns_mask(playout.current_player);
+                        for _ in 1..rng.roll(free.count_ones() as u8) {
+                            free &= free - 1;
+                        }
+                        let _ = playout.place_dice(free.trailing_zeros() as usize);
+                        playout.set_dice_value(rng.roll(playout.max_dice_value));
+                    }
+                    let score = playout.get_score(player);
+                    let other_score = playout.get_score(playout.get_other_player(player));
+                    total += if score > other_score {
+                        1.0
+                    } else if score == other_score {
+                        0.5
+                    } else {
+                        0.0
+                    };
+                }
+                total / playouts as f64
+            })
+        }
+
+        // Zobrist hash of the game, kept up to date by every move
+        fn get_zobrist_hash(&self) -> u64 {
+            self.hash
+        }
+
         fn copy(&self) -> Self {
+            *self
+        }
+
+        // Read-only view of both boards with shape (players, columns, rows), without any copy
+        // e.g. memoryview(game)[player, column, row] or np.asarray(game)
+        // The view follows the game as moves are played
+        unsafe fn __getbuffer__(
+            slf: Bound<'_, Self>,
+            view: *mut ffi::Py_buffer,
+            flags: c_int,
+        ) -> PyResult<()> {
+            if view.is_null() {
+                return Err(PyBufferError::new_err("View is null"));
+            }
+            if (flags & ffi::PyBUF_WRITABLE) == ffi::PyBUF_WRITABLE {
+                return Err(PyBufferError::new_err("The boards are read-only"));
+            }
+            // The two boards are not next to each other, the consumer must accept strides
+            if (flags & ffi::PyBUF_STRIDES) != ffi::PyBUF_STRIDES {
+                return Err(PyBufferError::new_err("The boards view is not contiguous"));
+            }
+
+            let game = slf.borrow();
+            unsafe {
+                (*view).buf = game.boards[0].cells.as_ptr() as *mut c_void;
+                (*view).len = 2 * game.max_number_of_elements as isize;
+                (*view).readonly = 1;
+                (*view).itemsize = 1;
+                (*view).format = if (flags & ffi::PyBUF_FORMAT) == ffi::PyBUF_FORMAT {
+                    c"B".as_ptr() as *mut c_char
+                } else {
+                    std::ptr::null_mut()
+                };
+                (*view).ndim = 3;
+                (*view).shape = game.view_shape.as_ptr() as *mut isize;
+                (*view).strides = game.view_strides.as_ptr() as *mut isize;
+                (*view).suboffsets = std::ptr::null_mut();
+                (*view).internal = std::ptr::null_mut();
+            }
+            drop(game);
+            unsafe {
+                (*view).obj = slf.into_any().into_ptr();
+            }
+            Ok(())
+        }
+    }
+
+    impl Knucklebones {
+        // Key of encode_game_key and the canonical keys, exact when every field fits in 64 bits
+        // Larger games (e.g. 4x4 with a d8 or 5x5 with a d12) get a 64-bit hash of the same
+        // fields instead, two positions then share a key with a probability of about 2^-64
+        fn pack_key(
+            &self,
+            column_order: &[usize],
+            sort_cells: bool,
+            include_dice: bool,
+        ) -> PyResult<u64> {
+            let bits = bits_for(self.max_dice_value);
+            let total_bits = (2 * self.max_number_of_elements as u32 + 1) * bits + 1;
+            let packed = total_bits <= u64::BITS;
+            let mut key: u64 = 0;
+            let mut push = |value: u8| {
+                key = if packed {
+                    (key << bits) | value as u64
+                } else {
+                    splitmix64(key ^ value as u64)
+                };
+            };
+            let mut sorted = [0u8; MAX_CELLS];
+            for player_index in 0..self.boards.len() {
+                for &column in column_order {
+                    let mut values = self.boards[player_index].column(column);
+                    if sort_cells {
+                        // Sorted on the stack, the keys are computed at every search node
+                        sorted[..values.len()].copy_from_slice(values);
+                        sorted[..values.len()].sort_unstable_by(|a, b| b.cmp(a));
+                        values = &sorted[..values.len()];
+                    }
+                    for &value in values {
+                        push(value);
+                    }
+                }
+            }
+            push(if include_dice { self.dice_value } else { 0 });
+            key = (key << 1) | self.current_player as u64;
+            Ok(key)
+        }
+
+        fn fixed_depth_search(
+            &self,
+            depth: usize,
+            algorithm: Algorithm,
+            threads: usize,
+            dice_samples: Option<usize>,
+            tt: &mut HashMap<u64, SearchEntry>,
+        ) -> PyResult<(usize, f64, u64)> {
+            let mut search = Search::new(tt, None, algorithm);
+            search.threads = threads;
+            search.dice_samples = dice_samples;
+            let (column, value) = self.search_root(depth, None, &mut search)?;
+            Ok((column, value, search.nodes))
+        }
+
+        fn iterative_deepening(
+            &self,
+            deadline: Instant,
+            max_depth: usize,
+            algorithm: Algorithm,
+            threads: usize,
+            dice_samples: Option<usize>,
+            tt: &mut HashMap<u64, SearchEntry>,
+        ) -> PyResult<(usize, f64, u64, usize)> {
+            // Depth 0 only evaluates the children, so there is always a move to return
+            let mut search = Search::new(tt, None, algorithm);
+            search.threads = threads;
+            search.dice_samples = dice_samples;
+            let (mut column, mut value) = self.search_root(0, None, &mut search)?;
+            let mut depth_reached = 0;
+
+            // The best move of the previous iteration is searched first, which narrows the window
+            // of the other moves with Star1 / Star2; the negamax root searches every move with a
+            // full window as its values depend on it
+            search.deadline = Some(deadline);
+            for depth in 1..=max_depth {
+                search.horizon = false;
+                match self.search_root(depth, Some(column), &mut search) {
+                    Ok((best_column, best_value)) => {
+                        column = best_column;
+                        value = best_value;
+                        depth_reached = depth;
+                        // Every leaf ended the game, a deeper search would search the same tree
+                        if !search.horizon {
+                            break;
+                        }
+                    }
+                    Err(_) if Instant::now() >= deadline => break,
+                    Err(error) => return Err(error),
+                }
+            }
+            Ok((column, value, search.nodes, depth_reached))
+        }
+
+        fn search_root(
+            &self,
+            depth: usize,
+            first_move: Option<usize>,
+            search: &mut Search,
+        ) -> PyResult<(usize, f64)> {
+            let mut columns = self.get_available_columns(self.current_player);
+            if let Some(index) = columns.iter().position(|&c| Some(c) == first_move) {
+                let column = columns.remove(index);
+                columns.insert(0, column);
+            }
+            if columns.is_empty() {
+                return Err(PyValueError::new_err("No move available, the game is over"));
+            }
+
+            if search.threads > 1 && depth > 0 {
+                return self.parallel_search_root(depth, &columns, search);
+            }
+
+            if search.algorithm != Algorithm::Negamax {
+                let (value, column) = self.max_node(
+                    self.dice_value,
+                    &columns,
+                    f64::NEG_INFINITY,
+                    f64::INFINITY,
+                    depth + 1,
+                    search,
+                )?;
+                return Ok((column, value / self.dice_scale(depth)));
+            }
+
+            let mut best: Option<(usize, f64)> = None;
+            for column in columns {
+                let mut child = self.copy();
+                child.place_dice(column)?;
+                let player = child.current_player;
+                let value =
+                    child.negamax(f64::NEG_INFINITY, f64::INFINITY, depth, player, search)?;
+                // The child value is seen from the opponent, keep the lowest one
+                if best.map_or(true, |(_, best_value)| value < best_value) {
+                    best = Some((column, value));
+                }
+            }
+            match best {
+                Some((column, value)) => Ok((column, -value)),
+                None => Err(PyValueError::new_err("No move available, the game is over")),
+            }
+        }
+
+        fn negamax(
+            &self,
+            mut alpha: f64,
+            beta: f64,
+            depth: usize,
+            current_player: usize,
+            search: &mut Search,
+        ) -> PyResult<f64> {
+            search.nodes += 1;
+            if let Some(deadline) = search.deadline {
+                if search.nodes % 1024 == 0 && Instant::now() >= deadline {
+                    return Err(PyTimeoutError::new_err("Search time budget exceeded"));
+                }
+            }
+            let alpha_original = alpha;
+
+            let key = self.encode_position_key()?;
+            if let Some(entry) = search.probe(key) {
+                if entry.depth >= depth
+                    && (entry.flag == EXACT
+                        || (entry.flag == LOWERBOUND && entry.value >= beta)
+                        || (entry.flag == UPPERBOUND && entry.value <= alpha))
+                {
+                    return Ok(entry.value);
+                }
+            }
+
+            let game_over = self.is_game_over();
+            if depth == 0 || game_over {
+                search.horizon |= !game_over;
+                return Ok(self.get_heuristic_score(current_player) as f64);
+            }
+
+            let columns = self.get_available_columns(self.current_player);
+            let mut value = f64::NEG_INFINITY;
+            for dice_value in self.searched_dice_values(search.dice_samples) {
+                let mut total = 0.0;
+                for &column in &columns {
+                    let mut child = self.copy();
+                    child.set_dice_value(dice_value);
+                    child.place_dice(column)?;
+                    total -= child.negamax(
+                        -beta,
+                        -alpha,
+                        depth - 1,
+                        self.get_other_player(current_player),
+                        search,
+                    )?;
+                }
+                value = value.max(total / columns.len() as f64);
+
+                alpha = alpha.max(value);
+                if alpha >= beta {
+                    break;
+                }
+            }
+
+            let flag = if value <= alpha_original {
+                UPPERBOUND
+            } else if value >= beta {
+                LOWERBOUND
+            } else {
+                EXACT
+            };
+            search.store(key, SearchEntry { value, flag, depth });
+
+            Ok(value)
+        }
+
+        // search_root spread over search.threads workers
+        // Every root move is a task, split by the dice value of the reply when there is one
+        // The workers share one table, added to the caller's one at the end
+        // The expectimax algorithms give exactly the same values as search_root, negamax values can
+        // differ slightly, and from one run to the other, as they depend on the order of the search
+        fn parallel_search_root(
+            &self,
+            depth: usize,
+            columns: &[usize],
+            search: &mut Search,
+        ) -> PyResult<(usize, f64)> {
+            let mut tasks = Vec::new();
+            for (index, &column) in columns.iter().enumerate() {
+                let mut child = self.copy();
+                child.place_dice(column)?;
+                if child.is_game_over() {
+                    tasks.push((index, child, None));
+                } else {
+                    for dice_value in self.searched_dice_values(search.dice_samples) {
+                        tasks.push((index, child, Some(dice_value)));
+                    }
+                }
+            }
+
+            let shared = SharedTable::new(64 * search.threads);
+            let next_task = AtomicUsize::new(0);
+            let (tasks, shared, next_task) = (&tasks, &shared, &next_task);
+            let (base, deadline, algorithm) = (&*search.tt, search.deadline, search.algorithm);
+            let dice_samples = search.dice_samples;
+            let workers = search.threads.min(tasks.len());
+            let results: Vec<_> = std::thread::scope(|scope| {
+                let handles: Vec<_> = (0..workers)
+                    .map(|_| {
+                        scope.spawn(move || {
+                            let mut unused = HashMap::new();
+                            let mut worker = Search::new(&mut unused, deadline, algorithm);
+                            worker.shared = Some((shared, base));
+                            worker.dice_samples = dice_samples;
+                            let mut values = Vec::new();
+                            loop {
+                                let index = next_task.fetch_add(1, Ordering::Relaxed);
+                                if index >= tasks.len() {
+                                    break;
+                                }
+                                let (_, child, dice_value) = &tasks[index];
+                                match child.root_task(*dice_value, depth, &mut worker) {
+                                    Ok(value) => values.push((index, value)),
+                                    Err(error) => {
+                                        return (Err(error), worker.nodes, worker.horizon)
+                                    }
+                                }
+                            }
+                            (Ok(values), worker.nodes, worker.horizon)
+                        })
+                    })
+                    .collect();
+                handles.into_iter().map(|handle| handle.join().unwrap()).collect()
+            });
+
+            // The entries are kept even when the search did not complete, as in search_root
+            for shard in &shared.shards {
+                search.tt.extend(shard.lock().unwrap().drain());
+            }
+            let mut task_values = vec![0.0; tasks.len()];
+            for (result, nodes, horizon) in results {
+                search.nodes += nodes;
+                search.horizon |= horizon;
+                for (index, value) in result? {
+                    task_values[index] = value;
+                }
+            }
+
+            // Value of each child for the opponent: max over the dice values for negamax, sum for
+            // expectimax, where each sampled dice value stands for several
+            let weight = self.dice_value_weight(search.dice_samples);
+            let mut child_values: Vec<Option<f64>> = vec![None; columns.len()];
+            for ((index, _, dice_value), value) in tasks.iter().zip(task_values) {
+                let value = match dice_value {
+                    Some(_) if search.algorithm != Algorithm::Negamax => value * weight,
+                    _ => value,
+                };
+                child_values[*index] = Some(match child_values[*index] {
+                    None => value,
+                    Some(current) if search.algorithm == Algorithm::Negamax => current.max(value),
+                    Some(current) => current + value,
+                });
+            }
+
+            // Same choice as search_root: the first move with the lowest value for the opponent
+            let mut best = (columns[0], f64::INFINITY);
+            for (&column, value) in columns.iter().zip(child_values) {
+                let value = value.unwrap_or(f64::INFINITY);
+                if value < best.1 {
+                    best = (column, value);
+                }
+            }
+            if search.algorithm == Algorithm::Negamax {
+                Ok((best.0, -best.1))
+            } else {
+                Ok((best.0, -best.1 / self.dice_scale(depth)))
+            }
+        }
+
+        // Value of a root child for the player to move, or of one of its dice values
+        fn root_task(
+            &self,
+            dice_value: Option<u8>,
+            depth: usize,
+            search: &mut Search,
+        ) -> PyResult<f64> {
+            let player = self.current_player;
+            let (alpha, beta) = (f64::NEG_INFINITY, f64::INFINITY);
+            let Some(dice_value) = dice_value else {
+                return match search.algorithm {
+                    Algorithm::Negamax => self.negamax(alpha, beta, depth, player, search),
+                    _ => self.chance_node(alpha, beta, depth, search),
+                };
+            };
+
+            let columns = self.get_available_columns(player);
+            if search.algorithm != Algorithm::Negamax {
+                return Ok(self.max_node(dice_value, &columns, alpha, beta, depth, search)?.0);
+            }
+            let mut total = 0.0;
+            for &column in &columns {
+                let mut child = self.copy();
+                child.set_dice_value(dice_value);
+                child.place_dice(column)?;
+                let other_player = self.get_other_player(player);
+                total -= child.negamax(alpha, beta, depth - 1, other_player, search)?;
+            }
+            Ok(total / columns.len() as f64)
+        }
+
+        // Native version of expectimax in src/negamax.py
+        // Expected value of the position for the player to move, before their dice is rolled
+        fn chance_node(
+            &self,
+            alpha: f64,
+            beta: f64,
+            depth: usize,
+            search: &mut Search,
+        ) -> PyResult<f64> {
+            search.nodes += 1;
+            if let Some(deadline) = search.deadline {
+                if search.nodes % 1024 == 0 && Instant::now() >= deadline {
+                    return Err(PyTimeoutError::new_err("Search time budget exceeded"));
+                }
+            }
+
+            let key = self.encode_position_key()?;
+            if let Some(entry) = search.probe(key) {
+                // Only entries of the same depth are used, so the value does not depend on the
+                // search order
+                if entry.depth == depth
+                    && (entry.flag == EXACT
+                        || (entry.flag == LOWERBOUND && entry.value >= beta)
+                        || (entry.flag == UPPERBOUND && entry.value <= alpha))
+                {
+                    return Ok(entry.value);
+                }
+            }
+
+            // The value is a sum over the dice values instead of an average, so that it stays an
+            // integer and every algorithm finds exactly the same value
+            let score = self.get_heuristic_score(self.current_player);
+            let game_over = self.is_game_over();
+            if depth == 0 || game_over {
+                search.horizon |= !game_over;
+                return Ok(score as f64 * self.dice_scale(depth));
+            }
+
+            let dice_values = self.searched_dice_values(search.dice_samples);
+            if dice_values.len() < self.max_dice_value as usize {
+                // The bounds below only hold for the exact sum, every child is searched
+                let columns = self.get_available_columns(self.current_player);
+                let (alpha, beta) = (f64::NEG_INFINITY, f64::INFINITY);
+                let mut total = 0.0;
+                for dice_value in dice_values {
+                    let (ordered, len) = self.ordered_columns(dice_value, &columns, search);
+                    let ordered = &ordered[..len];
+                    total += self.max_node(dice_value, ordered, alpha, beta, depth, search)?.0;
+                }
+                let value = total * self.dice_value_weight(search.dice_samples);
+                search.store(key, SearchEntry { value, flag: EXACT, depth });
+                return Ok(value);
+            }
+
+            // Bounds of the value of each dice value, at the scale of the children
+            // Each ply moves the score difference by at most `change` in favour of the player
+            // who moves
+            let count = self.max_dice_value as usize;
+            let change = self.get_max_score_change() as i64;
+            let max_score = self.get_max_score() as i64;
+            let scale = self.dice_scale(depth - 1);
+            let bound = (score + (depth as i64 + 1) / 2 * change).min(max_score) as f64 * scale;
+            let lower_bound = (score - depth as i64 / 2 * change).max(-max_score) as f64 * scale;
+            let columns = self.get_available_columns(self.current_player);
+
+            // Lower bound of the value of each dice value
+            let mut lower_bounds = vec![lower_bound; count];
+            // At depth 1 the probe would evaluate the same leaves as the search itself
+            if search.algorithm == Algorithm::Star2 && beta < f64::INFINITY && depth >= 2 {
+                // Probe: the first column alone gives a lower bound for every dice value
+                let mut lower_total = lower_bound * count as f64;
+                for index in 0..count {
+                    let needed = beta - (lower_total - lower_bounds[index]);
+                    if needed > lower_bounds[index] {
+                        let (ordered, _) = self.ordered_columns(index as u8 + 1, &columns, search);
+                        let (probe, _) = self.max_node(
+                            index as u8 + 1,
+                            &ordered[..1],
+                            lower_bound,
+                            needed.min(bound),
+                            depth,
+                            search,
+                        )?;
+                        lower_total += probe.max(lower_bounds[index]) - lower_bounds[index];
+                        lower_bounds[index] = probe.max(lower_bounds[index]);
+                    }
+                    if lower_total >= beta {
+                        let (value, flag) = (lower_total, LOWERBOUND);
+                        search.store(key, SearchEntry { value, flag, depth });
+                        return Ok(value);
+                    }
+                }
+            }
+
+            let mut total = 0.0;
+            let mut flag = EXACT;
+            let mut remaining_lower: f64 = lower_bounds.iter().sum();
+            for index in 0..count {
+                remaining_lower -= lower_bounds[index];
+                let remaining_upper = (count - index - 1) as f64 * bound;
+                let (child_alpha, child_beta, window) = if search.algorithm == Algorithm::Expectimax {
+                    (f64::NEG_INFINITY, f64::INFINITY, (f64::NEG_INFINITY, f64::INFINITY))
+                } else {
+                    // Star1: window outside of which the sum can no longer be in (alpha, beta)
+                    let child_alpha = alpha - total - remaining_upper;
+                    let child_beta = beta - total - remaining_lower;
+                    let window = (child_alpha.max(lower_bounds[index]), child_beta.min(bound));
+                    (child_alpha, child_beta, window)
+                };
+
+                let value = if window.0 < window.1 {
+                    let dice_value = index as u8 + 1;
+                    let (ordered, len) = self.ordered_columns(dice_value, &columns, search);
+                    let ordered = &ordered[..len];
+                    self.max_node(dice_value, ordered, window.0, window.1, depth, search)?.0
+                } else if child_beta <= lower_bounds[index] {
+                    // The known bounds of this dice value are enough to cut
+                    lower_bounds[index]
+                } else {
+                    bound
+                };
+                if value <= child_alpha {
+                    total += value + remaining_upper;
+                    flag = UPPERBOUND;
+                    break;
+                }
+                if value >= child_beta {
+                    total += value + remaining_lower;
+                    flag = LOWERBOUND;
+                    break;
+                }
+                // A fail low on the probed lower bound means the value is that bound
+                total += value.max(lower_bounds[index]);
+            }
+
+            let value = total;
+            search.store(key, SearchEntry { value, flag, depth });
+            Ok(value)
+        }
+
+        // Best value and column of the player to move for a known dice value
+        fn max_node(
+            &self,
+            dice_value: u8,
+            columns: &[usize],
+            alpha: f64,
+            beta: f64,
+            depth: usize,
+            search: &mut Search,
+        ) -> PyResult<(f64, usize)> {
+            let (mut best_value, mut best_column) = (f64::NEG_INFINITY, columns[0]);
+            for &column in columns {
+                let mut child = self.copy();
+                child.set_dice_value(dice_value);
+                child.place_dice(column)?;
+
+                let child_alpha = if search.algorithm == Algorithm::Expectimax {
+                    alpha
+                } else {
+                    alpha.max(best_value)
+                };
+                let value = -child.chance_node(-beta, -child_alpha, depth - 1, search)?;
+                if value > best_value {
+                    best_value = value;
+                    best_column = column;
+                }
+                if best_value >= beta {
+                    let key = self.history_key(dice_value, column);
+                    *search.history.entry(key).or_insert(0) += (depth * depth) as u64;
+                    break;
+                }
+            }
+            Ok((best_value, best_column))
+        }
+
+        // `columns` for a dice value, the ones whose moves caused the most cutoffs first; the
+        // sort is stable, so the order only changes once a cutoff is recorded
+        // The order only changes the number of nodes, the expectimax values stay exact
+        fn ordered_columns(
+            &self,
+            dice_value: u8,
+            columns: &[usize],
+            search: &Search,
+        ) -> ([usize; MAX_COLUMNS], usize) {
+            let mut ordered = [0; MAX_COLUMNS];
+            ordered[..columns.len()].copy_from_slice(columns);
+            if !search.history.is_empty() {
+                ordered[..columns.len()].sort_by_key(|&column| {
+                    let key = self.history_key(dice_value, column);
+                    std::cmp::Reverse(search.history.get(&key).copied().unwrap_or(0))
+                });
+            }
+            (ordered, columns.len())
+        }
+
+        // Key of a move in the history table: the dice value, the column and the cells of both
+        // players in that column, as in src/negamax.py
+        fn history_key(&self, dice_value: u8, column: usize) -> u64 {
+            let mut key = (dice_value as u64) << 8 | column as u64;
+            let other_player = self.get_other_player(self.current_player);
+            for player in [self.current_player, other_player] {
+                for &cell in self.boards[player].column(column) {
+                    key = splitmix64(key << 8 | cell as u64);
+                }
+            }
+            key
+        }
+
+        // Scale of the expectimax values of a given depth, exact up to 2^53
+        fn dice_scale(&self, depth: usize) -> f64 {
+            (self.max_dice_value as f64).powi(depth as i32)
+        }
+
+        // Dice values searched at a chance node: every value, or `samples` of them spread evenly
+        // over the range, the middle value of each of `samples` equal slices
+        // e.g. 2, 5, 8 and 11 for 4 samples of a d12
+        fn searched_dice_values(&self, samples: Option<usize>) -> Vec<u8> {
+            let count = self.max_dice_value as usize;
+            match samples {
+                Some(samples) if samples < count => (0..samples)
+                    .map(|index| ((2 * index + 1) * count / (2 * samples)) as u8 + 1)
+                    .collect(),
+                _ => (1..=self.max_dice_value).collect(),
+            }
+        }
+
+        // Number of dice values that each searched one stands for in the sums of expectimax
+        fn dice_value_weight(&self, samples: Option<usize>) -> f64 {
+            let count = self.max_dice_value as usize;
+            count as f64 / self.searched_dice_values(samples).len() as f64
+        }
+
+        // Values of a column from the highest to the lowest, empty cells last
+        fn sorted_column(&self, player_index: usize, column: usize) -> Vec<u8> {
+            let mut values = self.boards[player_index].column(column).to_vec();
+            values.sort_unstable_by(|a, b| b.cmp(a));
+            values
+        }
+
+        fn zobrist_cell(&self, player_index: usize, column: usize, row: usize, value: u8) -> u64 {
+            let cell = (player_index * self.columns_number + column) * self.rows_number + row;
+            splitmix64((cell * (self.max_dice_value as usize + 1) + value as usize) as u64)
+        }
+    }
+
+    // Several games advanced together for rollouts and data generation
+    // The state of every game lives in numpy arrays that Python reads without any copy
+    #[pyclass]
+    struct KnucklebonesBatch {
+        // (games, players, columns, rows)
+        boards: Py<PyArray4<u8>>,
+        dice_values: Py<PyArray1<u8>>,
+        current_players: Py<PyArray1<u8>>,
+        games_number: usize,
+        columns_number: usize,
+        rows_number: usize,
+        max_dice_value: u8,
+        rng: DiceRng,
+    }
+
+    #[pymethods]
+    impl KnucklebonesBatch {
+        #[new]
+        #[pyo3(signature = (games_number, columns_number, rows_number, max_dice_value, seed=None))]
+        fn new(
+            py: Python<'_>,
+            games_number: usize,
+            columns_number: usize,
+            rows_number: usize,
+            max_dice_value: u8,
+            seed: Option<u64>,
+        ) -> Self {
+            let mut rng = DiceRng::new(seed.unwrap_or_else(|| rand::rng().random()));
+            let dice_values: Vec<u8> = (0..games_number)
+                .map(|_| rng.roll(max_dice_value))
+                .collect();
             Self {
-                boards: self.boards.clone(),
-                columns_number: self.columns_number,
-                rows_number: self.rows_number,
-                max_dice_value: self.max_dice_value,
-                dice_value: self.dice_value,
-                current_player: self.current_player,
-                max_number_of_elements: self.max_number_of_elements,
+                boards: PyArray4::zeros(
+                    py,
+                    [games_number, 2, columns_number, rows_number],
+                    false,
+                )
+                .unbind(),
+                dice_values: dice_values.into_pyarray(py).unbind(),
+                current_players: PyArray1::zeros(py, games_number, false).unbind(),
+                games_number: games_number,
+                columns_number: columns_number,
+                rows_number: rows_number,
+                max_dice_value: max_dice_value,
+                rng: rng,
+            }
+        }
+
+        fn __len__(&self) -> usize {
+            self.games_number
+        }
+
+        fn boards<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray4<u8>> {
+            self.boards.bind(py).clone()
+        }
+
+        fn dice_values<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<u8>> {
+            self.dice_values.bind(py).clone()
+        }
+
+        fn current_players<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<u8>> {
+            self.current_players.bind(py).clone()
+        }
+
+        // Play one column per game for its current player and roll its dice again
+        // Games that are over and invalid or full columns are skipped
+        // Returns which moves were played
+        fn make_moves<'py>(
+            &mut self,
+            py: Python<'py>,
+            columns: PyReadonlyArray1<'py, i64>,
+        ) -> PyResult<Bound<'py, PyArray1<bool>>> {
+            let columns = columns.as_slice()?;
+            if columns.len() != self.games_number {
+                return Err(PyValueError::new_err(format!(
+                    "Expected {} columns, got {}",
+                    self.games_number,
+                    columns.len()
+                )));
+            }
+
+            let boards = self.boards.bind(py);
+            let mut boards = boards.readwrite();
+            let boards = boards.as_slice_mut()?;
+            let dice_values = self.dice_values.bind(py);
+            let mut dice_values = dice_values.readwrite();
+            let dice_values = dice_values.as_slice_mut()?;
+            let current_players = self.current_players.bind(py);
+            let mut current_players = current_players.readwrite();
+            let current_players = current_players.as_slice_mut()?;
+
+            let rows = self.rows_number;
+            let board_size = self.columns_number * rows;
+            let mut played = vec![false; self.games_number];
+            for game in 0..self.games_number {
+                let column = columns[game];
+                if column < 0 || column as usize >= self.columns_number {
+                    continue;
+                }
+                let game_boards = &mut boards[game * 2 * board_size..(game + 1) * 2 * board_size];
+                if game_boards.chunks(board_size).any(|board| board.iter().all(|&x| x != 0)) {
+                    continue;
+                }
+
+                let player = current_players[game] as usize;
+                let other = 1 - player;
+                let start = player * board_size + column as usize * rows;
+                if !place_in_column(&mut game_boards[start..start + rows], dice_values[game]) {
+                    continue;
+                }
+                let start = other * board_size + column as usize * rows;
+                remove_from_column(&mut game_boards[start..start + rows], dice_values[game]);
+
+                current_players[game] = other as u8;
+                dice_values[game] = self.rng.roll(self.max_dice_value);
+                played[game] = true;
+            }
+            Ok(played.into_pyarray(py))
+        }
+
+        // Score of both players of every game, shape (games, 2)
+        fn scores<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyArray2<i64>>> {
+            let boards = self.boards.bind(py).readonly();
+            let boards = boards.as_slice()?;
+            let scores: Vec<i64> = boards
+                .chunks(self.columns_number * self.rows_number)
+                .map(|board| {
+                    board
+                        .chunks(self.rows_number)
+                        .map(column_score)
+                        .sum::<usize>() as i64
+                })
+                .collect();
+            let scores = Array2::from_shape_vec((self.games_number, 2), scores)
+                .map_err(|error| PyValueError::new_err(error.to_string()))?;
+            Ok(scores.into_pyarray(py))
+        }
+
+        // True for the games where one of the boards is full
+        fn game_over_mask<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyArray1<bool>>> {
+            let boards = self.boards.bind(py).readonly();
+            let boards = boards.as_slice()?;
+            let board_size = self.columns_number * self.rows_number;
+            let mask: Vec<bool> = boards
+                .chunks(2 * board_size)
+                .map(|game_boards| {
+                    game_boards
+                        .chunks(board_size)
+                        .any(|board| board.iter().all(|&x| x != 0))
+                })
+                .collect();
+            Ok(mask.into_pyarray(py))
+        }
+
+        // Columns that are not full for the current player of every game, shape (games, columns)
+        fn available_columns_mask<'py>(
+            &self,
+            py: Python<'py>,
+        ) -> PyResult<Bound<'py, PyArray2<bool>>> {
+            let boards = self.boards.bind(py).readonly();
+            let boards = boards.as_slice()?;
+            let current_players = self.current_players.bind(py).readonly();
+            let current_players = current_players.as_slice()?;
+
+            let board_size = self.columns_number * self.rows_number;
+            let mut mask = Vec::with_capacity(self.games_number * self.columns_number);
+            for game in 0..self.games_number {
+                let start = (game * 2 + current_players[game] as usize) * board_size;
+                for column in boards[start..start + board_size].chunks(self.rows_number) {
+                    mask.push(column.contains(&0));
+                }
+            }
+            let mask = Array2::from_shape_vec((self.games_number, self.columns_number), mask)
+                .map_err(|error| PyValueError::new_err(error.to_string()))?;
+            Ok(mask.into_pyarray(py))
+        }
+
+        // Start every game again from empty boards
+        fn reset(&mut self, py: Python<'_>) -> PyResult<()> {
+            self.boards.bind(py).readwrite().as_slice_mut()?.fill(0);
+            self.current_players
+                .bind(py)
+                .readwrite()
+                .as_slice_mut()?
+                .fill(0);
+            let dice_values = self.dice_values.bind(py);
+            let mut dice_values = dice_values.readwrite();
+            for dice_value in dice_values.as_slice_mut()?.iter_mut() {
+                *dice_value = self.rng.roll(self.max_dice_value);
             }
+            Ok(())
         }
     }
 }
@@ -1,5 +1,112 @@
-from src.gui import GameUI
+import time
 
-if __name__ == "__main__":
+# Taken before any other import, the startup profile counts every import
+STARTUP = time.perf_counter()
+
+import argparse
+import sys
+
+# Heavy modules that the first frame must not wait for
+DEFERRED_MODULES = ("numpy", "src.negamax", "src.utils")
+# Seconds the startup profile waits for the opening book of the AI thread
+BOOK_LOAD_TIMEOUT = 30.0
+
+
+def profile_startup(budget: float) -> int:
+    """Import and create the game, draw the first frame and report the timings.
+
+    Returns 1 if the first frame took longer than `budget` seconds, for CI checks.
+    """
+    timings = []
+
+    def step(name, start):
+        timings.append((name, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    import pygame
+
+    step("import pygame", start)
+
+    start = time.perf_counter()
+    import knucklebones_rust
+
+    step("import knucklebones_rust", start)
+
+    # pygame imports NumPy itself when it is installed
+    imported = set(sys.modules)
+    start = time.perf_counter()
+    from src.gui import GameUI
+
+    step("import src.gui", start)
+    # Checked before GameUI starts the AI thread, which may import them in the background
+    loaded = [name for name in DEFERRED_MODULES if name in set(sys.modules) - imported]
+
+    start = time.perf_counter()
     game = GameUI(ai_depth=3)
+    step("GameUI()", start)
+
+    start = time.perf_counter()
+    game.draw()
+    step("first frame", start)
+    first_frame = time.perf_counter() - STARTUP
+
+    # Loaded on the AI thread, after the window is shown
+    if game.ai_worker.book_ready.wait(BOOK_LOAD_TIMEOUT):
+        timings.append(("opening book (AI thread)", game.ai_worker.book_load_time))
+    else:
+        print(f"Opening book still loading after {BOOK_LOAD_TIMEOUT:.0f} s")
+
+    for name, duration in timings:
+        print(f"{name:<28} {duration * 1000:>9.1f} ms")
+    print(f"{'window ready':<28} {first_frame * 1000:>9.1f} ms (budget {budget * 1000:.0f} ms)")
+    if loaded:
+        print(f"Imported by src.gui: {', '.join(loaded)}")
+
+    game.ai_worker.stop(timeout=1)
+    pygame.quit()
+    return 0 if first_frame <= budget else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Knucklebones")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print the import and initialisation timings and exit",
+    )
+    parser.add_argument(
+        "--startup-budget",
+        type=float,
+        default=1.0,
+        help="seconds until the first frame, --profile-startup fails above it",
+    )
+    parser.add_argument("--columns", type=int, default=3, help="columns per board")
+    parser.add_argument("--rows", type=int, default=3, help="rows per column")
+    parser.add_argument("--dice", type=int, default=6, help="faces of the dice")
+    parser.add_argument(
+        "--dice-samples",
+        type=int,
+        help="dice values searched by the AI at each roll, for dice with many faces",
+    )
+    parser.add_argument(
+        "--algorithm",
+        choices=("negamax", "expectimax", "star1", "star2"),
+        default="negamax",
+        help="search algorithm of the AI, the exact ones also play from endgame.bin",
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        sys.exit(profile_startup(args.startup_budget))
+
+    from src.gui import GameUI
+
+    game = GameUI(
+        ai_depth=3,
+        columns_number=args.columns,
+        rows_number=args.rows,
+        max_dice_value=args.dice,
+        ai_dice_samples=args.dice_samples,
+        ai_algorithm=args.algorithm,
+    )
     game.run()
@@ -0,0 +1,193 @@
+from typing import TYPE_CHECKING, Callable
+import threading
+import queue
+import time
+import os
+
+import knucklebones_rust as kb
+
+from src.mcts import MCTS
+
+# The opening book needs NumPy, it is only imported by the loader on the worker thread
+if TYPE_CHECKING:
+    from src.opening_book import OpeningBook
+    from src.tablebase import Tablebase
+
+# Threads of the searches of the AI's own moves, half the cores so that the GUI keeps one
+DEFAULT_THREADS = max(1, (os.cpu_count() or 2) // 2)
+
+
+class AIWorker:
+    """Native search on a persistent background thread, working on copies of the game.
+
+    `request_move` queues a search and `poll` returns its move once found, so the caller
+    keeps the only reference to the game it plays on. `ponder` searches the replies to
+    every move and dice value of the opponent in advance, on `ponder_threads` threads as
+    it runs during the opponent's whole turn; only the replies of the last position
+    pondered are kept. `cancel` drops the queued work and the result of the search in
+    progress, which runs to its end with the GIL released. The table is kept, it only
+    depends on the positions. With `agent="mcts"` the moves are searched by MCTS with
+    `playouts` playouts, or during `time_budget` if given, instead of the native negamax;
+    it keeps its tree between moves and does not ponder. `book_loader` is called on the
+    worker thread before any search and replaces `book`, so a slow load does not delay
+    the caller; `book_ready` is set once it is done, the worker plays without a book if
+    the loader fails. `dice_samples` caps the dice values the native search looks at in
+    each chance node, for large dice. `algorithm` is the native search algorithm, the
+    book is only used if its values mean the same (`OpeningBook.matches`); with an exact
+    one ("expectimax", "star1" or "star2") the tablebase returned by `tablebase_loader`,
+    loaded with the book, plays the moves whose columns all lead to solved positions
+    without searching.
+    """
+
+    def __init__(
+        self,
+        depth: int = 2,
+        time_budget: float | None = None,
+        threads: int = DEFAULT_THREADS,
+        book: "OpeningBook | None" = None,
+        agent: str = "negamax",
+        playouts: int = 2000,
+        book_loader: Callable[[], "OpeningBook | None"] | None = None,
+        dice_samples: int | None = None,
+        algorithm: str = "negamax",
+        tablebase_loader: Callable[[], "Tablebase | None"] | None = None,
+        ponder_threads: int = 1,
+    ):
+        if agent not in ("negamax", "mcts"):
+            raise ValueError(f"Unknown agent {agent!r}, expected 'negamax' or 'mcts'")
+        self.depth = depth
+        self.time_budget = time_budget
+        self.threads = threads
+        self.ponder_threads = ponder_threads
+        self.book = book
+        self.book_loader = book_loader
+        self.book_ready = threading.Event()
+        self.book_load_time = 0.0
+        self.agent = agent
+        self.dice_samples = dice_samples
+        self.algorithm = algorithm
+        # The tablebase values are expected values, negamax does not use them
+        self.tablebase = None
+        self.tablebase_loader = tablebase_loader if algorithm != "negamax" else None
+
+        # Only used by the worker thread, replies are keyed by encode_game_key
+        self.table = kb.SearchTable()
+        self.mcts = None
+        if agent == "mcts":
+            self.mcts = MCTS(None if time_budget is not None else playouts, time_budget)
+        self.replies = {}
+
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        # Work queued before the last cancel has an older generation and is skipped
+        self.generation = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def request_move(self, game: object) -> None:
+        """Search the best move of the player to move, pondering in progress is dropped."""
+        self.generation += 1
+        self.requests.put(("move", self.generation, game.copy()))
+
+    def ponder(self, game: object) -> None:
+        """Search the replies to every move and dice value of the player to move."""
+        # MCTS keeps its tree between moves instead
+        if self.mcts is not None:
+            return
+        self.requests.put(("ponder", self.generation, game.copy()))
+
+    def poll(self) -> int | None:
+        """Move of the last request, None while it is being searched."""
+        while not self.results.empty():
+            generation, move = self.results.get()
+            if generation == self.generation:
+                return move
+        return None
+
+    def cancel(self) -> None:
+        """Drop the queued work and the result of the search in progress."""
+        self.generation += 1
+
+    def stop(self, timeout: float | None = None) -> None:
+        self.generation += 1
+        self.requests.put(None)
+        self.thread.join(timeout)
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            if self.book_loader is not None:
+                self.book = self.book_loader()
+            if self.tablebase_loader is not None:
+                self.tablebase = self.tablebase_loader()
+        except Exception as e:
+            # An unreadable file must not stop the thread the moves are searched on
+            print(f"Opening book or tablebase not loaded: {e!r}")
+            self.book = None
+            self.tablebase = None
+        finally:
+            self.book_load_time = time.perf_counter() - start
+            self.book_ready.set()
+
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            kind, generation, game = request
+            if generation != self.generation:
+                continue
+
+            if kind == "move":
+                move = self.replies.get(game.encode_game_key())
+                if move is None:
+                    move = self._search(game)
+                self.results.put((generation, move))
+            else:
+                self._ponder(game, generation)
+
+    def _ponder(self, game: object, generation: int) -> None:
+        # The replies to the previous positions can no longer be asked for
+        self.replies.clear()
+        for column in game.get_available_columns(game.get_current_player()):
+            for dice_value in range(1, game.get_max_dice_value() + 1):
+                if generation != self.generation:
+                    return
+                reply = game.copy()
+                reply.make_move(column, dice_value)
+                if reply.is_game_over():
+                    continue
+                key = reply.encode_game_key()
+                if key not in self.replies:
+                    self.replies[key] = self._search(reply, self.ponder_threads)
+
+    def _search(self, game: object, threads: int | None = None) -> int:
+        if threads is None:
+            threads = self.threads
+        # MCTS only plays the book moves, their values do not matter
+        if self.book is not None and (
+            self.mcts is not None or self.book.matches(self.algorithm)
+        ):
+            entry = self.book.get(game)
+            if entry is not None:
+                return entry[0]
+        if self.mcts is not None:
+            return self.mcts.get_best_move(game)[0]
+        if self.tablebase is not None:
+            entry = self.tablebase.best_move(game)
+            if entry is not None:
+                return entry[0]
+        if self.time_budget is not None:
+            return game.best_move_timed(
+                self.time_budget,
+                self.table,
+                algorithm=self.algorithm,
+                threads=threads,
+                dice_samples=self.dice_samples,
+            )[0]
+        return game.best_move(
+            self.depth,
+            self.table,
+            algorithm=self.algorithm,
+            threads=threads,
+            dice_samples=self.dice_samples,
+        )[0]
@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+
+# Every feature is the difference between the player and the other player
+FEATURES = ("score", "multiplier_potential", "exposure", "free_cells")
+
+# The score difference alone, the same values as `get_heuristic_score`
+DEFAULT_WEIGHTS = {
+    "score": 1.0,
+    "multiplier_potential": 0.0,
+    "exposure": 0.0,
+    "free_cells": 0.0,
+}
+
+
+class Evaluator:
+    """Linear evaluation of positions from their boards, many positions at once.
+
+    The boards are a `(positions, 2, columns, rows)` array, as built from `np.asarray(game)`
+    or returned by `KnucklebonesBatch.boards()`, and each position is evaluated for its own
+    player. The features of a player are:
+
+    - "score": their score
+    - "multiplier_potential": the points their next dice adds on top of its value by
+      matching the dice of a column, averaged over the dice values, in the columns with
+      a free cell
+    - "exposure": the points the other player removes from them with their next dice,
+      averaged over the dice values, in the columns where the other player has a free cell
+    - "free_cells": their number of free cells
+
+    A finished game is evaluated by its score alone.
+    """
+
+    def __init__(self, weights: dict | None = None):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        unknown = sorted(set(weights) - set(FEATURES))
+        if unknown:
+            raise ValueError(f"Unknown features {unknown}, expected some of {FEATURES}")
+        self.weights = weights
+        self.weight_vector = np.array([weights[name] for name in FEATURES], dtype=np.float64)
+
+    @classmethod
+    def load(cls, filename: str) -> "Evaluator":
+        """Evaluator with the weights of a JSON file mapping feature names to weights."""
+        with open(filename) as f:
+            return cls(json.load(f))
+
+    def save(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.weights, f, indent=2)
+
+    def is_score_only(self) -> bool:
+        """True if the values are the score difference, as with the default weights."""
+        return self.weights == DEFAULT_WEIGHTS
+
+    def features(
+        self, boards: np.ndarray, players: np.ndarray, max_dice_value: int
+    ) -> np.ndarray:
+        """`(positions, len(FEATURES))` array of the features of each position."""
+        boards = np.asarray(boards)
+        players = np.asarray(players, dtype=np.intp)
+        rows_number = boards.shape[3]
+
+        # Number of dice of each value in each column, (dice values, positions, 2, columns)
+        values = np.arange(1, max_dice_value + 1)
+        counts = (boards[None] == values[:, None, None, None, None]).sum(axis=-1)
+        values = values[:, None, None, None]
+        free = rows_number - np.count_nonzero(boards, axis=-1)
+
+        # A dice of value v in a column with c dice of value v scores v * (2c + 1) more
+        column_scores = (values * counts * counts).sum(axis=0)
+        potential = (2 * values * counts).sum(axis=0) * (free > 0)
+        # The other player's dice removes every dice of its value from the same column
+        exposure = column_scores * (free[:, ::-1] > 0)
+
+        player_features = np.stack(
+            [
+                column_scores.sum(axis=-1),
+                potential.sum(axis=-1) / max_dice_value,
+                exposure.sum(axis=-1) / max_dice_value,
+                free.sum(axis=-1),
+            ],
+            axis=-1,
+        )
+        index = np.arange(len(boards))
+        return player_features[index, players] - player_features[index, 1 - players]
+
+    def evaluate(
+        self, boards: np.ndarray, players: np.ndarray, max_dice_value: int
+    ) -> np.ndarray:
+        """Value of each position for its player."""
+        boards = np.asarray(boards)
+        features = self.features(boards, players, max_dice_value)
+        finished = np.all(boards.reshape(len(boards), 2, -1) != 0, axis=-1).any(axis=-1)
+        return np.where(finished, features[:, 0], features @ self.weight_vector)
+
+    def evaluate_game(self, game: object, player: int) -> float:
+        """Value of one game for `player`."""
+        boards = np.asarray(game)[None]
+        return float(self.evaluate(boards, [player], game.get_max_dice_value())[0])
@@ -1,4 +1,3 @@
-import threading
 import random
 import time
 import math
@@ -7,8 +6,7 @@ import sys
 import knucklebones_rust
 import pygame
 
-from src.negamax import get_best_move
-from src.utils import load_tt
+from src.ai_worker import DEFAULT_THREADS, AIWorker
 
 # --- CONFIGURATION GRAPHIQUE ---
 SCREEN_WIDTH = 800
@@ -30,9 +28,47 @@ COLORS = {
 COLUMN_WIDTH = 100
 COLUMN_HEIGHT = 240
 MARGIN = 20
+DICE_SIZE = 60
+DICE_SPACING = 10
+# Place laissée de chaque côté des grilles pour les scores
+GRID_SIDE_SPACE = 140
+AI_GRID_Y = 50
+HUMAN_GRID_Y = SCREEN_HEIGHT - 350
+
+# Nombre de niveaux de transparence des sprites de particules
+PARTICLE_ALPHA_LEVELS = 32
+
+
+def load_ai_book(columns_number, rows_number, max_dice_value):
+    """Livre d'ouvertures construit par python -m src.opening_book, s'il existe et
+    correspond aux dimensions du jeu"""
+    # Importé ici : src.utils charge NumPy et toute la recherche Python
+    from src.utils import load_opening_book
+
+    try:
+        return load_opening_book(columns_number, rows_number, max_dice_value)
+    except ValueError as e:
+        # Livre construit pour une autre taille de plateau
+        print(f"Livre d'ouvertures ignoré : {e}")
+        return None
+
+
+def load_ai_tablebase(columns_number, rows_number, max_dice_value):
+    """Table des finales construite par python -m src.tablebase, si elle existe et
+    correspond aux dimensions du jeu"""
+    from src.utils import load_tablebase
+
+    try:
+        return load_tablebase(columns_number, rows_number, max_dice_value)
+    except ValueError as e:
+        print(f"Table des finales ignorée : {e}")
+        return None
 
 
 class Particle:
+    # Sprites partagés par toutes les particules, par couleur, taille et transparence
+    sprites = {}
+
     def __init__(self, x, y, color):
         self.x = x
         self.y = y
@@ -53,13 +89,20 @@ class Particle:
         self.life -= self.decay
 
     def draw(self, surface):
-        if self.life > 0:
-            alpha = int(self.life * 255)
-            s = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
+        """Dessine la particule et renvoie la zone modifiée"""
+        if self.life <= 0:
+            return None
+        level = int(self.life * (PARTICLE_ALPHA_LEVELS - 1))
+        key = (self.color, self.size, level)
+        sprite = Particle.sprites.get(key)
+        if sprite is None:
+            alpha = 255 * level // (PARTICLE_ALPHA_LEVELS - 1)
+            sprite = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
             pygame.draw.circle(
-                s, (*self.color, alpha), (self.size, self.size), self.size
+                sprite, (*self.color, alpha), (self.size, self.size), self.size
             )
-            surface.blit(s, (int(self.x - self.size), int(self.y - self.size)))
+            Particle.sprites[key] = sprite
+        return surface.blit(sprite, (int(self.x - self.size), int(self.y - self.size)))
 
 
 class MovingDie:
@@ -91,7 +134,19 @@ class MovingDie:
 
 
 class GameUI:
-    def __init__(self, ai_depth=2):
+    def __init__(
+        self,
+        ai_depth=2,
+        ai_time_budget=None,
+        ai_threads=DEFAULT_THREADS,
+        ai_agent="negamax",
+        ai_playouts=2000,
+        columns_number=3,
+        rows_number=3,
+        max_dice_value=6,
+        ai_dice_samples=None,
+        ai_algorithm="negamax",
+    ):
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Knucklebones - Cult Of The Lamb")
@@ -102,19 +157,76 @@ class GameUI:
         self.large_font = pygame.font.SysFont("Segoe UI", 48, bold=True)
         self.small_font = pygame.font.SysFont("Segoe UI", 18)
 
-        self.game = knucklebones_rust.Knucklebones(3, 3, 6)
+        self.columns_number = columns_number
+        self.rows_number = rows_number
+        self.max_dice_value = max_dice_value
+        self.game = knucklebones_rust.Knucklebones(
+            columns_number, rows_number, max_dice_value
+        )
 
-        # Safe load
-        self.tt = load_tt("tt.pkl")
+        # Colonnes et dés rétrécis pour que les grandes grilles tiennent dans la fenêtre
+        grid_width = SCREEN_WIDTH - 2 * GRID_SIDE_SPACE
+        self.column_width = min(
+            COLUMN_WIDTH, (grid_width - (columns_number - 1) * MARGIN) // columns_number
+        )
+        self.dice_size = min(
+            DICE_SIZE,
+            self.column_width - 2 * DICE_SPACING,
+            (COLUMN_HEIGHT - DICE_SPACING) // rows_number - DICE_SPACING,
+        )
 
         self.running = True
         self.ai_thinking = False
         self.ai_depth = ai_depth
+        # Temps maximum de réflexion de l'IA en secondes, remplace ai_depth si défini
+        self.ai_time_budget = ai_time_budget
+        # Nombre de threads de la recherche native des coups de l'IA, 0 pour utiliser
+        # tous les cœurs ; par défaut la moitié, et un seul pendant le tour du joueur
+        self.ai_threads = ai_threads
+        # "negamax" ou "mcts", qui utilise ai_playouts parties aléatoires par coup
+        self.ai_agent = ai_agent
+        # Nombre de valeurs cherchées à chaque lancer de dé, pour les dés à beaucoup de faces
+        self.ai_dice_samples = ai_dice_samples
+        # Algorithme de la recherche native, la table des finales n'est utilisée que
+        # par les algorithmes exacts ("expectimax", "star1", "star2")
+        self.ai_algorithm = ai_algorithm
+
+        # L'IA cherche dans son propre thread sur des copies du jeu, sa table de
+        # transposition est conservée entre les coups et les parties
+        # Le livre d'ouvertures est chargé par ce thread, la fenêtre s'affiche sans l'attendre
+        self.ai_worker = AIWorker(
+            ai_depth,
+            ai_time_budget,
+            ai_threads,
+            agent=ai_agent,
+            playouts=ai_playouts,
+            book_loader=lambda: load_ai_book(columns_number, rows_number, max_dice_value),
+            dice_samples=ai_dice_samples,
+            algorithm=ai_algorithm,
+            tablebase_loader=lambda: load_ai_tablebase(
+                columns_number, rows_number, max_dice_value
+            ),
+        )
+        self.ai_move = None
+        self.ai_ready_time = 0.0
+        if self.game.get_current_player() == 0:
+            self.ai_worker.ponder(self.game)
 
         self.particles = []
         self.moving_dice = []
         self.hidden_slots = {}
 
+        # Rendu : sprites des dés et textes mis en cache, fond statique dessiné une
+        # seule fois, et seules les zones animées sont envoyées à l'écran tant que
+        # l'état affiché ne change pas
+        self.dice_sprites = {}
+        self.text_cache = {}
+        self.background = self.build_background()
+        self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 150))
+        self.last_frame_state = None
+        self.last_dirty_rects = []
+
     def spawn_particles(self, x, y, color, count=15):
         for _ in range(count):
             self.particles.append(Particle(x, y, color))
@@ -128,7 +240,56 @@ class GameUI:
             )
         pygame.draw.rect(surface, color, rect, border_radius=radius)
 
+    def column_rect(self, col_idx, start_y):
+        grid_width = (
+            self.columns_number * self.column_width + (self.columns_number - 1) * MARGIN
+        )
+        start_x = (SCREEN_WIDTH - grid_width) // 2
+        col_x = start_x + col_idx * (self.column_width + MARGIN)
+        return pygame.Rect(col_x, start_y, self.column_width, COLUMN_HEIGHT)
+
+    def dice_position(self, col_idx, row_idx, start_y):
+        """Coin supérieur gauche du dé d'une case"""
+        padding = (self.column_width - self.dice_size) // 2
+        col_x = self.column_rect(col_idx, start_y).x
+        return col_x + padding, start_y + row_idx * (self.dice_size + DICE_SPACING) + DICE_SPACING
+
+    def build_background(self):
+        """Fond, cercle central et emplacements des colonnes"""
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        background.fill(COLORS["bg_dark"])
+
+        center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        pygame.draw.circle(background, COLORS["bg_light"], center, 500)
+
+        for start_y in (AI_GRID_Y, HUMAN_GRID_Y):
+            for col_idx in range(self.columns_number):
+                rect = self.column_rect(col_idx, start_y)
+                self.draw_rounded_rect(background, rect, COLORS["board_slot"], radius=12)
+        return background
+
+    def render_text(self, font, text, color):
+        """Texte rendu une seule fois par police, contenu et couleur"""
+        key = (font, text, color)
+        surf = self.text_cache.get(key)
+        if surf is None:
+            surf = font.render(text, True, color)
+            self.text_cache[key] = surf
+        return surf
+
     def draw_dice_face(self, surface, x, y, size, value, color_tint=None):
+        """Dessine un dé depuis le cache de sprites et renvoie la zone modifiée"""
+        key = (value, size, color_tint)
+        sprite = self.dice_sprites.get(key)
+        if sprite is None:
+            # Place pour l'ombre décalée de 3 pixels
+            sprite = pygame.Surface((size + 3, size + 3), pygame.SRCALPHA)
+            self.render_dice_face(sprite, 0, 0, size, value, color_tint)
+            sprite = sprite.convert_alpha()
+            self.dice_sprites[key] = sprite
+        return surface.blit(sprite, (int(x), int(y)))
+
+    def render_dice_face(self, surface, x, y, size, value, color_tint=None):
         """Dessine un dé"""
         rect = pygame.Rect(x, y, size, size)
 
@@ -164,16 +325,42 @@ class GameUI:
         if value in pts:
             for px, py in pts[value]:
                 pygame.draw.circle(surface, dot_color, (x + px, y + py), size // 9)
+        else:
+            # Dés à plus de 6 faces : la valeur est écrite
+            font = pygame.font.SysFont("Segoe UI", size // 2, bold=True)
+            text = font.render(str(value), True, dot_color)
+            surface.blit(text, text.get_rect(center=(x + c, y + c)))
 
     def draw_board_ui(self):
         """Arrière-plan et éléments fixes"""
-        self.screen.fill(COLORS["bg_dark"])
-
-        center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        pygame.draw.circle(self.screen, COLORS["bg_light"], center, 500)
+        self.screen.blit(self.background, (0, 0))
+
+    def hovered_column(self):
+        """Colonne du joueur sous la souris, si elle peut être jouée"""
+        if (
+            self.game.get_current_player() != 0
+            or self.ai_thinking
+            or self.game.is_game_over()
+        ):
+            return None
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        for col_idx in range(self.columns_number):
+            if self.column_rect(col_idx, HUMAN_GRID_Y).collidepoint(mouse_x, mouse_y):
+                return col_idx
+        return None
+
+    def frame_state(self):
+        """Tout ce qui change l'image hors animations, pour savoir quand tout redessiner"""
+        return (
+            self.game.encode_game_key(),
+            self.game.get_current_player(),
+            self.ai_thinking,
+            len(self.moving_dice) == 0,
+            tuple(sorted(self.hidden_slots)),
+            self.hovered_column(),
+        )
 
-    def draw_player_grid(self, board_obj, player_idx, start_y, is_human, is_active):
-        grid = board_obj.get_board()
+    def draw_player_grid(self, boards, player_idx, start_y, is_human, is_active):
         score = self.game.get_score(player_idx)
 
         base_color = COLORS["accent"] if is_human else COLORS["enemy"]
@@ -181,8 +368,8 @@ class GameUI:
 
         # Affichage du Score
         score_text = "JOUEUR" if is_human else "IA"
-        name_surf = self.font.render(score_text, True, display_color)
-        score_surf = self.large_font.render(str(score), True, display_color)
+        name_surf = self.render_text(self.font, score_text, display_color)
+        score_surf = self.render_text(self.large_font, str(score), display_color)
 
         if is_human:
             self.screen.blit(name_surf, (30, start_y - 40))
@@ -191,26 +378,15 @@ class GameUI:
             self.screen.blit(name_surf, (30, start_y + COLUMN_HEIGHT + 10))
             self.screen.blit(score_surf, (30, start_y + COLUMN_HEIGHT + 35))
 
-        # Colonnes
-        start_x = (SCREEN_WIDTH - (3 * COLUMN_WIDTH + 2 * MARGIN)) // 2
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        # Colonnes, leurs emplacements sont déjà dans le fond
+        hovered = self.hovered_column() if is_human else None
 
-        for col_idx in range(3):
-            col_x = start_x + col_idx * (COLUMN_WIDTH + MARGIN)
-            col_rect = pygame.Rect(col_x, start_y, COLUMN_WIDTH, COLUMN_HEIGHT)
+        for col_idx in range(self.columns_number):
+            col_rect = self.column_rect(col_idx, start_y)
 
             # Hover
-            bg_col = COLORS["board_slot"]
-            is_hovered = col_rect.collidepoint(mouse_x, mouse_y)
-
-            if (
-                is_human
-                and is_active
-                and is_hovered
-                and not self.ai_thinking
-                and not self.game.is_game_over()
-            ):
-                bg_col = tuple(min(255, c + 30) for c in bg_col)
+            if col_idx == hovered:
+                bg_col = tuple(min(255, c + 30) for c in COLORS["board_slot"])
                 # Indicateur de sélection
                 glow_rect = col_rect.inflate(6, 6)
                 pygame.draw.rect(
@@ -220,37 +396,33 @@ class GameUI:
                     border_radius=14,
                     width=2,
                 )
+                self.draw_rounded_rect(self.screen, col_rect, bg_col, radius=12)
 
-            self.draw_rounded_rect(self.screen, col_rect, bg_col, radius=12)
-
-            dice_size = 60
-            padding = (COLUMN_WIDTH - dice_size) // 2
-
-            column_values = grid[col_idx]
-            for row_idx, val in enumerate(column_values):
+            for row_idx in range(boards.shape[2]):
+                val = boards[player_idx, col_idx, row_idx]
                 if val != 0:
                     if (player_idx, col_idx, row_idx) in self.hidden_slots:
                         continue
 
-                    dice_y = start_y + row_idx * (dice_size + 10) + 10
+                    dice_x, dice_y = self.dice_position(col_idx, row_idx, start_y)
                     self.draw_dice_face(
-                        self.screen, col_x + padding, dice_y, dice_size, val, base_color
+                        self.screen, dice_x, dice_y, self.dice_size, val, base_color
                     )
 
     def trigger_move_animation(self, player_idx, col_idx, dice_val):
         """Prépare l'animation visuelle d'un coup"""
         # Calcule de la position de départ
-        start_x = SCREEN_WIDTH // 2 - 30
-        start_y = SCREEN_HEIGHT // 2 - 30
+        half_size = self.dice_size // 2
+        start_x = SCREEN_WIDTH // 2 - half_size
+        start_y = SCREEN_HEIGHT // 2 - half_size
 
         # Calcule de la position d'arrivée
-        board = self.game.get_boards()[player_idx].get_board()
-        col_values = board[col_idx]
+        boards = memoryview(self.game)
 
         # Index de la dernière valeur non nulle
         target_row = -1
-        for r in range(len(col_values) - 1, -1, -1):
-            if col_values[r] != 0:
+        for r in range(boards.shape[2] - 1, -1, -1):
+            if boards[player_idx, col_idx, r] != 0:
                 target_row = r
                 break
 
@@ -258,14 +430,10 @@ class GameUI:
             return
 
         # Calcul coordonnées écran
-        grid_start_y = 50 if player_idx == 1 else SCREEN_HEIGHT - 350
-        grid_start_x = (SCREEN_WIDTH - (3 * COLUMN_WIDTH + 2 * MARGIN)) // 2
-
-        col_x = grid_start_x + col_idx * (COLUMN_WIDTH + MARGIN)
-        dice_size = 60
-        padding = (COLUMN_WIDTH - dice_size) // 2
-        target_screen_x = col_x + padding
-        target_screen_y = grid_start_y + target_row * (dice_size + 10) + 10
+        grid_start_y = AI_GRID_Y if player_idx == 1 else HUMAN_GRID_Y
+        target_screen_x, target_screen_y = self.dice_position(
+            col_idx, target_row, grid_start_y
+        )
 
         slot_key = (player_idx, col_idx, target_row)
         self.hidden_slots[slot_key] = True
@@ -275,7 +443,9 @@ class GameUI:
         def on_land():
             if slot_key in self.hidden_slots:
                 del self.hidden_slots[slot_key]
-            self.spawn_particles(target_screen_x + 30, target_screen_y + 30, color)
+            self.spawn_particles(
+                target_screen_x + half_size, target_screen_y + half_size, color
+            )
 
         anim = MovingDie(
             (start_x, start_y),
@@ -294,16 +464,13 @@ class GameUI:
             return
 
         x, y = pos
-        human_start_y = SCREEN_HEIGHT - 350
-        if y < human_start_y:
+        if y < HUMAN_GRID_Y:
             return
 
-        start_x = (SCREEN_WIDTH - (3 * COLUMN_WIDTH + 2 * MARGIN)) // 2
         dice_val_to_play = self.game.get_dice_value()
 
-        for col_idx in range(3):
-            col_x = start_x + col_idx * (COLUMN_WIDTH + MARGIN)
-            rect = pygame.Rect(col_x, human_start_y, COLUMN_WIDTH, COLUMN_HEIGHT)
+        for col_idx in range(self.columns_number):
+            rect = self.column_rect(col_idx, HUMAN_GRID_Y)
 
             if rect.collidepoint(x, y):
                 try:
@@ -316,36 +483,53 @@ class GameUI:
                     print(f"Erreur: {e}")
                 break
 
-    def ai_turn_logic(self):
-        """Logique IA dans le thread"""
-        if self.ai_depth <= 2:
-            time.sleep(1)
+    def start_ai_turn(self):
+        """Demande le coup de l'IA au worker, sans bloquer l'interface"""
+        self.ai_thinking = True
+        self.ai_move = None
+        self.ai_worker.request_move(self.game)
+        # Petite pause pour que les coups rapides restent lisibles
+        self.ai_ready_time = time.perf_counter() + (1 if self.ai_depth <= 2 else 0)
+
+    def update_ai_turn(self):
+        """Joue le coup de l'IA dès qu'il est trouvé"""
+        if self.ai_move is None:
+            self.ai_move = self.ai_worker.poll()
+        if self.ai_move is None or time.perf_counter() < self.ai_ready_time:
+            return
 
-        best_move, _ = get_best_move(self.game, self.ai_depth, self.tt)
         dice_val = self.game.get_dice_value()
-
-        self.game.make_move(best_move)
-        self.trigger_move_animation(1, best_move, dice_val)
-
+        self.game.make_move(self.ai_move)
+        self.trigger_move_animation(1, self.ai_move, dice_val)
+        self.ai_move = None
         self.ai_thinking = False
 
+        # Pendant le tour du joueur, l'IA prépare ses réponses à chaque dé possible
+        if not self.game.is_game_over():
+            self.ai_worker.ponder(self.game)
+
     def draw(self):
+        state = self.frame_state()
+        animating = len(self.moving_dice) > 0 or len(self.particles) > 0
+        # Rien n'a changé depuis la dernière image
+        if state == self.last_frame_state and not animating and not self.last_dirty_rects:
+            return
+
         self.draw_board_ui()
 
-        boards = self.game.get_boards()
+        # Vue sur les plateaux du moteur, sans copie
+        boards = memoryview(self.game)
         current_player = self.game.get_current_player()
 
-        self.draw_player_grid(boards[1], 1, 50, False, current_player == 1)
-        self.draw_player_grid(
-            boards[0], 0, SCREEN_HEIGHT - 350, True, current_player == 0
-        )
+        self.draw_player_grid(boards, 1, AI_GRID_Y, False, current_player == 1)
+        self.draw_player_grid(boards, 0, HUMAN_GRID_Y, True, current_player == 0)
 
         if not self.game.is_game_over() and len(self.moving_dice) == 0:
             center_y = SCREEN_HEIGHT // 2 - 50
             dice_x = SCREEN_WIDTH // 2 - 40
 
             msg = "À toi de jouer !" if current_player == 0 else "L'IA réfléchit..."
-            txt = self.font.render(msg, True, COLORS["text_main"])
+            txt = self.render_text(self.font, msg, COLORS["text_main"])
             self.screen.blit(
                 txt, (SCREEN_WIDTH // 2 - txt.get_width() // 2, center_y - 40)
             )
@@ -355,16 +539,22 @@ class GameUI:
                 self.screen, dice_x, center_y, 80, self.game.get_dice_value(), col
             )
 
+        # Zones des éléments animés, les seules à envoyer à l'écran si l'état est le même
+        dirty_rects = []
         for anim in self.moving_dice:
-            self.draw_dice_face(self.screen, anim.x, anim.y, 60, anim.value, anim.color)
+            dirty_rects.append(
+                self.draw_dice_face(
+                    self.screen, anim.x, anim.y, self.dice_size, anim.value, anim.color
+                )
+            )
 
         for p in self.particles:
-            p.draw(self.screen)
+            rect = p.draw(self.screen)
+            if rect is not None:
+                dirty_rects.append(rect)
 
         if self.game.is_game_over() and len(self.moving_dice) == 0:
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            self.screen.blit(overlay, (0, 0))
+            self.screen.blit(self.overlay, (0, 0))
 
             s0 = self.game.get_score(0)
             s1 = self.game.get_score(1)
@@ -379,17 +569,25 @@ class GameUI:
                 msg = "ÉGALITÉ"
                 col = COLORS["text_main"]
 
-            txt = self.large_font.render(msg, True, col)
+            txt = self.render_text(self.large_font, msg, col)
             self.screen.blit(
                 txt, (SCREEN_WIDTH // 2 - txt.get_width() // 2, SCREEN_HEIGHT // 2 - 50)
             )
 
-            sub = self.font.render("Appuyez pour recommencer", True, (200, 200, 200))
+            sub = self.render_text(
+                self.font, "Appuyez pour recommencer", (200, 200, 200)
+            )
             self.screen.blit(
                 sub, (SCREEN_WIDTH // 2 - sub.get_width() // 2, SCREEN_HEIGHT // 2 + 20)
             )
 
-        pygame.display.flip()
+        if state != self.last_frame_state:
+            pygame.display.flip()
+        else:
+            # Les zones de l'image précédente sont effacées, les nouvelles dessinées
+            pygame.display.update(self.last_dirty_rects + dirty_rects)
+        self.last_frame_state = state
+        self.last_dirty_rects = dirty_rects
 
     def update(self):
         for p in self.particles[:]:
@@ -407,6 +605,9 @@ class GameUI:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type == pygame.WINDOWEXPOSED:
+                    # La fenêtre doit être entièrement redessinée
+                    self.last_frame_state = None
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if self.game.is_game_over():
                         self.reset()
@@ -415,21 +616,30 @@ class GameUI:
 
             if not self.game.is_game_over() and len(self.moving_dice) == 0:
                 if self.game.get_current_player() == 1 and not self.ai_thinking:
-                    self.ai_thinking = True
-                    thread = threading.Thread(target=self.ai_turn_logic)
-                    thread.start()
+                    self.start_ai_turn()
+            if self.ai_thinking:
+                self.update_ai_turn()
 
             self.update()
             self.draw()
             self.clock.tick(60)
 
+        self.ai_worker.stop(timeout=1)
         pygame.quit()
         sys.exit()
 
     def reset(self):
-        self.game = knucklebones_rust.Knucklebones(3, 3, 6)
+        # Le résultat d'une recherche en cours concerne l'ancienne partie
+        self.ai_worker.cancel()
+        self.game = knucklebones_rust.Knucklebones(
+            self.columns_number, self.rows_number, self.max_dice_value
+        )
         self.ai_thinking = False
+        self.ai_move = None
+        if self.game.get_current_player() == 0:
+            self.ai_worker.ponder(self.game)
         self.ai_depth = self.ai_depth
         self.particles = []
         self.moving_dice = []
         self.hidden_slots = {}
+        self.last_frame_state = None
@@ -0,0 +1,144 @@
+import random
+import math
+import time
+
+# Moves searched from a previous root to find the new one, ours and the opponent's reply
+REUSE_PLIES = 2
+
+
+class DecisionNode:
+    """Position with a known dice value, where the player to move picks a column."""
+
+    __slots__ = ("key", "children", "untried", "visits")
+
+    def __init__(self, game: object):
+        self.key = game.encode_game_key()
+        # Column -> ChanceNode
+        self.children = {}
+        mask = game.get_free_columns_mask(game.get_current_player())
+        self.untried = [column for column in range(mask.bit_length()) if mask >> column & 1]
+        self.visits = 0
+
+
+class ChanceNode:
+    """Position after a column is played, before the dice of the next player is rolled.
+
+    `wins` is the sum of the results for the player who played the column.
+    """
+
+    __slots__ = ("children", "visits", "wins")
+
+    def __init__(self):
+        # Dice value -> DecisionNode
+        self.children = {}
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTS:
+    """Monte Carlo Tree Search with chance nodes and UCT selection.
+
+    Every iteration walks down the tree, drawing the dice of the chance nodes at random,
+    adds one node and plays `rollouts` random games from it in `random_playouts`. The
+    results are 1 for a win, 0.5 for a draw and 0 for a loss. The search stops after
+    `playouts` iterations or when `time_budget` (in seconds) runs out, whichever comes
+    first. The tree is kept between calls: the next search starts from the node of the
+    new position if it was reached by our move and the opponent's reply.
+    """
+
+    def __init__(
+        self,
+        playouts: int | None = 1000,
+        time_budget: float | None = None,
+        exploration: float = 1.4,
+        rollouts: int = 1,
+        seed: int | None = None,
+    ):
+        if playouts is None and time_budget is None:
+            raise ValueError("MCTS needs a number of playouts or a time budget")
+        self.playouts = playouts
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.rollouts = rollouts
+        self.rng = random.Random(seed)
+        self.root = None
+        self.iterations = 0
+
+    def get_best_move(self, game: object) -> tuple[int, float]:
+        """Most visited column and its win rate for the player to move."""
+        root = self.find_root(game)
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        self.iterations = 0
+        while self.playouts is None or self.iterations < self.playouts:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.iterate(root, game.copy())
+            self.iterations += 1
+
+        self.root = root
+        if not root.children:
+            # No iteration ran, any free column will do
+            return root.untried[0], 0.5
+        column, child = max(root.children.items(), key=lambda item: item[1].visits)
+        return column, child.wins / child.visits
+
+    def find_root(self, game: object) -> DecisionNode:
+        """Node of the position in the kept tree, or a new tree."""
+        key = game.encode_game_key()
+        nodes = [self.root] if self.root is not None else []
+        for _ in range(REUSE_PLIES + 1):
+            for node in nodes:
+                if node.key == key:
+                    return node
+            nodes = [
+                decision
+                for node in nodes
+                for chance in node.children.values()
+                for decision in chance.children.values()
+            ]
+        return DecisionNode(game)
+
+    def iterate(self, node: DecisionNode, game: object) -> None:
+        """One selection, expansion, playout and backpropagation on `game`, a copy."""
+        # Chance nodes of the path with the player who played their column
+        path = []
+        while not game.is_game_over():
+            node.visits += 1
+            if node.untried:
+                column = node.untried.pop(self.rng.randrange(len(node.untried)))
+                chance = node.children[column] = ChanceNode()
+            else:
+                column, chance = self.select(node)
+            path.append((chance, game.get_current_player()))
+            game.play(column, game.get_dice_value())
+            if chance.visits == 0 or game.is_game_over():
+                break
+
+            dice_value = self.rng.randint(1, game.get_max_dice_value())
+            game.set_dice_value(dice_value)
+            node = chance.children.get(dice_value)
+            if node is None:
+                node = chance.children[dice_value] = DecisionNode(game)
+
+        if not game.is_game_over():
+            # The dice of the new position, the first move of the playouts uses it
+            game.set_dice_value(self.rng.randint(1, game.get_max_dice_value()))
+        player = game.get_current_player()
+        result = game.random_playouts(self.rollouts, self.rng.getrandbits(64))
+        for chance, mover in path:
+            chance.visits += 1
+            chance.wins += result if mover == player else 1 - result
+
+    def select(self, node: DecisionNode) -> tuple[int, ChanceNode]:
+        """Child with the highest upper confidence bound."""
+        log_visits = math.log(node.visits)
+
+        def ucb(item):
+            chance = item[1]
+            exploitation = chance.wins / chance.visits
+            return exploitation + self.exploration * math.sqrt(log_visits / chance.visits)
+
+        return max(node.children.items(), key=ucb)
@@ -1,83 +1,798 @@
+import time
+
 import numpy as np
 
+from src.transposition import TranspositionTable
+from src.opening_book import OpeningBook
+from src.search_stats import SearchStats
+from src.evaluation import Evaluator
+from src.tablebase import Tablebase
+
+# "negamax" is the original search, the others compute the exact expectimax value,
+# without pruning at the chance nodes or with Ballard's Star1 / Star2 pruning
+ALGORITHMS = ("negamax", "expectimax", "star1", "star2")
+
+
+class SearchTimeout(Exception):
+    pass
+
 
 def other_player(player: int) -> int:
     return 1 if player == 0 else 0
 
 
-def get_best_move(game: object, depth: int, tt: dict) -> int:
-    moves = []
-    for column in game.get_available_columns(game.get_current_player()):
-        copy_game = game.copy()
-        copy_game.make_move(column)
-        value = negamax(
-            game=copy_game,
-            alpha=float("-inf"),
-            beta=float("inf"),
-            depth=depth,
-            current_player=copy_game.get_current_player(),
-            tt=tt,
+def free_columns(game: object, player: int) -> list[int]:
+    mask = game.get_free_columns_mask(player)
+    return [column for column in range(mask.bit_length()) if mask >> column & 1]
+
+
+def sample_dice_values(max_dice_value: int, dice_samples: int | None) -> list[int]:
+    """Dice values searched at a chance node: every value, or `dice_samples` of them spread
+    evenly over the range, the middle value of each of `dice_samples` equal slices.
+
+    e.g. [2, 5, 8, 11] for 4 samples of a d12, each one standing for 3 dice values.
+    """
+    if dice_samples is None or dice_samples >= max_dice_value:
+        return list(range(1, max_dice_value + 1))
+    return [
+        (2 * index + 1) * max_dice_value // (2 * dice_samples) + 1
+        for index in range(dice_samples)
+    ]
+
+
+def column_signatures(game: object) -> list[int]:
+    """Content of each column as one integer, the cells of the player to move then the
+    other player's ones, read from a single copy of the boards."""
+    view = memoryview(game)
+    _, columns_number, rows_number = view.shape
+    data = view.tobytes()
+    player = game.get_current_player()
+    own = player * columns_number * rows_number
+    other = other_player(player) * columns_number * rows_number
+    signatures = []
+    for column in range(columns_number):
+        start = column * rows_number
+        signatures.append(
+            int.from_bytes(data[own + start : own + start + rows_number])
+            << 8 * rows_number
+            | int.from_bytes(data[other + start : other + start + rows_number])
+        )
+    return signatures
+
+
+def history_key(signatures: list[int], dice_value: int, column: int) -> int:
+    """Key of a move in the history table: the dice value, the column and its content."""
+    return (signatures[column] << 16) | (dice_value << 8) | column
+
+
+def order_dice_values(
+    game: object,
+    dice_values: list[int],
+    columns: list[int],
+    tt_move: int | None,
+    history: dict,
+) -> list[int]:
+    """`dice_values`, the TT move first and then by the best history score of their columns."""
+    if not history:
+        return sorted(dice_values, key=lambda dice_value: dice_value != tt_move)
+    signatures = column_signatures(game)
+
+    def priority(dice_value):
+        score = max(
+            history.get(history_key(signatures, dice_value, column), 0) for column in columns
+        )
+        return dice_value != tt_move, -score
+
+    return sorted(dice_values, key=priority)
+
+
+def order_columns(
+    signatures: list[int], dice_value: int, columns: list[int], history: dict
+) -> list[int]:
+    return sorted(
+        columns,
+        key=lambda column: -history.get(history_key(signatures, dice_value, column), 0),
+    )
+
+
+class BatchedEvaluator:
+    """Leaf evaluation of one search, batched over the leaves below each depth 2 node.
+
+    `prefetch` evaluates every grandchild of a depth 2 node in one call and keeps their
+    values by position key, so the depth 1 nodes below it read their leaves instead of
+    evaluating them one node at a time.
+    """
+
+    def __init__(self, evaluator: Evaluator):
+        self.evaluator = evaluator
+        # Value of a position for the player who moved into it
+        self.values = {}
+
+    def evaluate_game(self, game: object, player: int) -> float:
+        return self.evaluator.evaluate_game(game, player)
+
+    def evaluate(self, game: object, boards: list[bytes], players: list[int]) -> np.ndarray:
+        """Values of the `boards` copied from `game`'s buffer, each for its player."""
+        shape = memoryview(game).shape
+        boards = np.frombuffer(b"".join(boards), dtype=np.uint8).reshape(-1, *shape)
+        return self.evaluator.evaluate(
+            boards, np.array(players), game.get_max_dice_value()
         )
+
+    def prefetch(self, game: object, dice_values: list[int], columns: list[int]) -> None:
+        """Evaluate the children of every child of `game` that does not end the game."""
+        keys, boards, players = [], [], []
+        for dice_value in dice_values:
+            for column in columns:
+                token = game.play(column, dice_value)
+                if not game.is_game_over():
+                    player = game.get_current_player()
+                    for child_dice_value in dice_values:
+                        for child_column in free_columns(game, player):
+                            child_token = game.play(child_column, child_dice_value)
+                            key = game.encode_position_key()
+                            if key not in self.values:
+                                # Marks the key so that a transposition is evaluated once
+                                self.values[key] = None
+                                keys.append(key)
+                                boards.append(bytes(memoryview(game)))
+                                players.append(player)
+                            game.undo(child_token)
+                game.undo(token)
+        if keys:
+            self.values.update(zip(keys, self.evaluate(game, boards, players).tolist()))
+
+
+def evaluate_children(
+    game: object,
+    dice_values: list[int],
+    columns: list[int],
+    player: int,
+    evaluator: BatchedEvaluator,
+) -> np.ndarray:
+    """Values for `player` of the children of every dice value and column, the ones not
+    prefetched by the parent node evaluated in one batch.
+
+    Returns a `(len(dice_values), len(columns))` array.
+    """
+    values = np.empty(len(dice_values) * len(columns))
+    missing, boards = [], []
+    index = 0
+    for dice_value in dice_values:
+        for column in columns:
+            token = game.play(column, dice_value)
+            value = evaluator.values.get(game.encode_position_key())
+            if value is None:
+                missing.append(index)
+                boards.append(bytes(memoryview(game)))
+            else:
+                values[index] = value
+            game.undo(token)
+            index += 1
+    if missing:
+        values[missing] = evaluator.evaluate(game, boards, [player] * len(boards))
+    return values.reshape(len(dice_values), len(columns))
+
+
+def probe_children(
+    game: object,
+    dice_values: list[int],
+    columns: list[int],
+    leaf_values: np.ndarray,
+    tablebase: Tablebase,
+    stats: SearchStats | None = None,
+) -> np.ndarray:
+    """`leaf_values` with the children found in the tablebase replaced by their value."""
+    for row, dice_value in enumerate(dice_values):
+        for index, column in enumerate(columns):
+            token = game.play(column, dice_value)
+            tablebase_value = tablebase.get(game.encode_position_key())
+            game.undo(token)
+            if tablebase_value is not None:
+                if stats is not None:
+                    stats.tablebase_hits += 1
+                # The tablebase value is for the player to move in the child
+                leaf_values[row, index] = -tablebase_value
+    return leaf_values
+
+
+def get_best_move(
+    game: object,
+    depth: int,
+    tt: dict | TranspositionTable,
+    deadline: float | None = None,
+    first_move: int | None = None,
+    algorithm: str = "negamax",
+    stats: SearchStats | None = None,
+    tablebase: Tablebase | None = None,
+    book: OpeningBook | None = None,
+    move_ordering: bool | None = None,
+    evaluator: Evaluator | None = None,
+    dice_samples: int | None = None,
+) -> int:
+    """Best column for the current dice and its value, searched `depth` plies deep.
+
+    With `dice_samples` only that many dice values, spread over the range by
+    `sample_dice_values`, are searched at each chance node. This caps the branching of
+    large dice, the value is then an estimate and the chance nodes are not pruned. A table
+    must only be used with one `dice_samples`. The `tablebase` is only probed by the
+    exact algorithms, "expectimax", "star1" and "star2", whose values have the same
+    meaning; "negamax" ignores it. `move_ordering` defaults to on for the exact
+    algorithms, where the order only changes the number of nodes, and off for "negamax",
+    whose cutoffs make its values depend on the order.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {ALGORITHMS}")
+    # The book was searched deeper than any search done here
+    if book is not None and book.matches(algorithm):
+        entry = book.get(game)
+        if entry is not None:
+            return entry
+    pruning = None if algorithm in ("negamax", "expectimax") else algorithm
+    # The default weights give the heuristic score, which the engine computes without NumPy
+    if evaluator is not None and evaluator.is_score_only():
+        evaluator = None
+    if evaluator is not None:
+        evaluator = BatchedEvaluator(evaluator)
+        # The chance node bounds only hold for leaves evaluated by the score difference
+        pruning = None
+    # Nor for a sum over some of the dice values
+    count = game.get_max_dice_value()
+    if len(sample_dice_values(count, dice_samples)) < count:
+        pruning = None
+    if move_ordering is None:
+        move_ordering = algorithm != "negamax"
+    # Moves that caused cutoffs in this search, searched first in the other nodes
+    history = {} if move_ordering else None
+    if stats is not None:
+        search_start = time.perf_counter()
+
+    # The search plays and undoes the moves on its own copy of the game
+    game = game.copy()
+    columns = free_columns(game, game.get_current_player())
+    # Only the Star1/Star2 root passes the best value so far to the next moves, the
+    # negamax one searches each move with a full window, as its values depend on it
+    if first_move in columns:
+        columns.remove(first_move)
+        columns.insert(0, first_move)
+
+    moves = []
+    best_sum = float("-inf")
+    for column in columns:
+        if stats is not None:
+            start, nodes = time.perf_counter(), stats.total_nodes()
+
+        if algorithm == "negamax":
+            token = game.play(column, game.get_dice_value())
+            value = -negamax(
+                game=game,
+                alpha=float("-inf"),
+                beta=float("inf"),
+                depth=depth,
+                current_player=game.get_current_player(),
+                tt=tt,
+                deadline=deadline,
+                stats=stats,
+                history=history,
+                evaluator=evaluator,
+                dice_samples=dice_samples,
+            )
+            game.undo(token)
+        else:
+            # With pruning, the best move so far bounds the search of the next ones
+            value, _ = max_node(
+                game,
+                game.get_dice_value(),
+                [column],
+                float("-inf") if pruning is None else best_sum,
+                float("inf"),
+                depth + 1,
+                tt,
+                pruning,
+                deadline,
+                stats,
+                history,
+                evaluator,
+                dice_samples,
+                tablebase,
+            )
+            best_sum = max(best_sum, value)
+            # Back from the sum over the dice values to the expected value
+            value /= game.get_max_dice_value() ** depth
         moves.append((column, value))
 
-    best_move = min(moves, key=lambda x: x[1])
-    return best_move[0], -float(best_move[1])
+        if stats is not None:
+            stats.root_moves.append(
+                {
+                    "depth": depth,
+                    "move": column,
+                    "value": float(value),
+                    "nodes": stats.total_nodes() - nodes,
+                    "time": time.perf_counter() - start,
+                }
+            )
+
+    if stats is not None:
+        stats.time += time.perf_counter() - search_start
+
+    best_move = max(moves, key=lambda x: x[1])
+    return best_move[0], float(best_move[1])
+
+
+def get_best_move_timed(
+    game: object,
+    time_budget: float,
+    tt: dict | TranspositionTable,
+    max_depth: int = 64,
+    algorithm: str = "negamax",
+    stats: SearchStats | None = None,
+    tablebase: Tablebase | None = None,
+    book: OpeningBook | None = None,
+    move_ordering: bool | None = None,
+    evaluator: Evaluator | None = None,
+    dice_samples: int | None = None,
+) -> tuple[int, float, int]:
+    """Iterative deepening until the time budget (in seconds) runs out, or until a search
+    reaches the end of the game on every leaf, as a deeper one would search the same tree.
+
+    Returns the best move and score of the deepest completed search and its depth, or
+    of the opening book and the depth it was built with. The search always counts its
+    nodes to find the leaves cut off by the depth, in a private SearchStats if `stats`
+    is None.
+    """
+    if book is not None and book.matches(algorithm):
+        entry = book.get(game)
+        if entry is not None:
+            return *entry, book.depth
+
+    deadline = time.perf_counter() + time_budget
+    if stats is None:
+        stats = SearchStats()
+
+    # Depth 0 only evaluates the children, so there is always a move to return
+    best_move, score = get_best_move(
+        game,
+        0,
+        tt,
+        algorithm=algorithm,
+        stats=stats,
+        tablebase=tablebase,
+        move_ordering=move_ordering,
+        evaluator=evaluator,
+        dice_samples=dice_samples,
+    )
+    depth_reached = 0
+    for depth in range(1, max_depth + 1):
+        horizon_leaves = stats.horizon_leaves
+        try:
+            best_move, score = get_best_move(
+                game,
+                depth,
+                tt,
+                deadline=deadline,
+                first_move=best_move,
+                algorithm=algorithm,
+                stats=stats,
+                tablebase=tablebase,
+                move_ordering=move_ordering,
+                evaluator=evaluator,
+                dice_samples=dice_samples,
+            )
+        except SearchTimeout:
+            break
+        depth_reached = depth
+        if stats.horizon_leaves == horizon_leaves:
+            break
+
+    return best_move, score, depth_reached
 
 
 def negamax(
-    game: object, alpha: float, beta: float, depth: int, current_player: int, tt: dict
+    game: object,
+    alpha: float,
+    beta: float,
+    depth: int,
+    current_player: int,
+    tt: dict | TranspositionTable,
+    deadline: float | None = None,
+    stats: SearchStats | None = None,
+    history: dict | None = None,
+    evaluator: BatchedEvaluator | None = None,
+    dice_samples: int | None = None,
 ):
+    """Value of the position for `current_player`: the best dice value for them, of the
+    mean over the columns of the value of each child.
+
+    With a `history` table the dice values are ordered, the best dice value stored in the
+    TT entry as its "move" first, then the ones whose moves caused the most cutoffs. With
+    an `evaluator` the unfinished leaves are evaluated by it, the ones below a depth 2
+    node in one batch. With `dice_samples` only the dice values of `sample_dice_values` are searched.
+    """
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if stats is not None:
+        stats.visit(depth)
+
     alpha_original = alpha
 
-    tt_entry = tt.get(game.encode_game())
+    key = game.encode_position_key()
+    tt_entry = tt.get(key)
+    if stats is not None:
+        stats.tt_probes += 1
+        stats.tt_hits += tt_entry is not None
     if tt_entry and tt_entry["depth"] >= depth:
-        if tt_entry["flag"] == "EXACT":
-            return tt_entry["value"]
-        elif tt_entry["flag"] == "LOWERBOUND" and tt_entry["value"] >= beta:
-            return tt_entry["value"]
-        elif tt_entry["flag"] == "UPPERBOUND" and tt_entry["value"] <= alpha:
+        if (
+            tt_entry["flag"] == "EXACT"
+            or (tt_entry["flag"] == "LOWERBOUND" and tt_entry["value"] >= beta)
+            or (tt_entry["flag"] == "UPPERBOUND" and tt_entry["value"] <= alpha)
+        ):
+            if stats is not None:
+                stats.tt_cutoffs[tt_entry["flag"]] += 1
             return tt_entry["value"]
 
-    if depth == 0 or game.is_game_over():
+    game_over = game.is_game_over()
+    if depth == 0 or game_over:
+        if stats is not None:
+            stats.leaf_evaluations += 1
+            stats.horizon_leaves += not game_over
+        # A finished game is evaluated by its score alone
+        if evaluator is not None and not game_over:
+            return evaluator.evaluate_game(game, current_player)
         return game.get_heuristic_score(current_player)
 
+    if stats is not None:
+        stats.expanded_nodes += 1
+
     value = float("-inf")
-    moves = game.get_possible_moves()
-    for dice_value, columns in moves:
-        negamax_values = []
-        for column in columns:
-            copy_game = game.copy()
-            copy_game.set_dice_value(dice_value)
-            copy_game.make_move(column)
-
-            negamax_values.append(
-                -negamax(
-                    copy_game,
-                    -beta,
-                    -alpha,
-                    depth - 1,
-                    other_player(current_player),
-                    tt,
+    best_dice_value = None
+    columns = free_columns(game, current_player)
+    dice_values = sample_dice_values(game.get_max_dice_value(), dice_samples)
+    if history is not None:
+        tt_move = tt_entry.get("move") if tt_entry else None
+        dice_values = order_dice_values(game, dice_values, columns, tt_move, history)
+    if depth == 2 and evaluator is not None:
+        evaluator.prefetch(game, dice_values, columns)
+    leaf_values = None
+    if depth == 1 and evaluator is not None:
+        leaf_values = evaluate_children(game, dice_values, columns, current_player, evaluator)
+    for row, dice_value in enumerate(dice_values):
+        if leaf_values is not None:
+            negamax_values = list(leaf_values[row])
+            if stats is not None:
+                for _ in columns:
+                    stats.visit(0)
+                stats.leaf_evaluations += len(columns)
+                # Not checked for the end of the game, counted as cut off
+                stats.horizon_leaves += len(columns)
+        else:
+            negamax_values = []
+            for column in columns:
+                token = game.play(column, dice_value)
+                negamax_values.append(
+                    -negamax(
+                        game,
+                        -beta,
+                        -alpha,
+                        depth - 1,
+                        other_player(current_player),
+                        tt,
+                        deadline,
+                        stats,
+                        history,
+                        evaluator,
+                        dice_samples,
+                    )
                 )
-            )
+                game.undo(token)
 
-        value = max(value, np.mean(negamax_values))
+        if stats is not None:
+            stats.children += len(columns)
+        dice_value_mean = sum(negamax_values) / len(negamax_values)
+        if dice_value_mean > value:
+            value, best_dice_value = dice_value_mean, dice_value
 
         alpha = max(alpha, value)
         if alpha >= beta:
+            if stats is not None:
+                stats.alpha_beta_cutoffs += 1
+            if history is not None:
+                # The column that did the most for the cutoff
+                column = columns[negamax_values.index(max(negamax_values))]
+                key = history_key(column_signatures(game), dice_value, column)
+                history[key] = history.get(key, 0) + depth * depth
             break
 
-    if tt_entry is None:
-        tt_entry = {}
-
-    tt_entry["value"] = value
+    # The probed entry may be reused by the table, a new one is stored
     if value <= alpha_original:
-        tt_entry["flag"] = "UPPERBOUND"
+        flag = "UPPERBOUND"
     elif value >= beta:
-        tt_entry["flag"] = "LOWERBOUND"
+        flag = "LOWERBOUND"
     else:
-        tt_entry["flag"] = "EXACT"
-    tt_entry["depth"] = depth
-    tt[game.encode_game()] = tt_entry
+        flag = "EXACT"
+    tt_entry = {"value": value, "flag": flag, "depth": depth}
+    if best_dice_value is not None:
+        tt_entry["move"] = best_dice_value
+    tt[key] = tt_entry
 
     return value
+
+
+def expectimax(
+    game: object,
+    alpha: float,
+    beta: float,
+    depth: int,
+    tt: dict | TranspositionTable,
+    pruning: str | None = "star2",
+    deadline: float | None = None,
+    stats: SearchStats | None = None,
+    history: dict | None = None,
+    evaluator: BatchedEvaluator | None = None,
+    dice_samples: int | None = None,
+    tablebase: Tablebase | None = None,
+) -> float:
+    """Expected value of the position for the player to move, before their dice is rolled.
+
+    Every dice value has the same probability and the player then picks the best column.
+    The value is returned as a sum over the dice values, i.e. scaled by
+    `max_dice_value ** depth`, so that it stays an integer and every algorithm finds
+    exactly the same value. With `pruning` set to "star1" or "star2" the chance nodes are
+    cut with the score bounds of the game, the value is the same as with `pruning=None`.
+    The table must not be shared with the negamax search. With a `history` table the
+    columns of each dice value are ordered by the cutoffs their moves caused. With an
+    `evaluator` the unfinished leaves are evaluated by it, the ones below a depth 2 node
+    in one batch; pruning then needs an evaluator that only uses the score. With `dice_samples`
+    only the dice values of `sample_dice_values` are searched, each one counted for the
+    values it stands for, and `pruning` must be None. The positions of the `tablebase`
+    get its exact value, at the same scale; the pruning bounds are then widened to the
+    highest score, as a solved endgame can end further than `depth` plies away.
+    """
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if stats is not None:
+        stats.visit(depth)
+
+    count = game.get_max_dice_value()
+    key = game.encode_position_key()
+    # A solved endgame is worth more than any search, it is checked first
+    if tablebase is not None:
+        tablebase_value = tablebase.get(key)
+        if tablebase_value is not None:
+            if stats is not None:
+                stats.tablebase_hits += 1
+            return tablebase_value * count**depth
+
+    tt_entry = tt.get(key)
+    if stats is not None:
+        stats.tt_probes += 1
+        stats.tt_hits += tt_entry is not None
+    # Only entries of the same depth are used, so the value does not depend on the search order
+    if tt_entry and tt_entry["depth"] == depth:
+        if (
+            tt_entry["flag"] == "EXACT"
+            or (tt_entry["flag"] == "LOWERBOUND" and tt_entry["value"] >= beta)
+            or (tt_entry["flag"] == "UPPERBOUND" and tt_entry["value"] <= alpha)
+        ):
+            if stats is not None:
+                stats.tt_cutoffs[tt_entry["flag"]] += 1
+            return tt_entry["value"]
+
+    score = game.get_heuristic_score(game.get_current_player())
+    game_over = game.is_game_over()
+    if depth == 0 or game_over:
+        if stats is not None:
+            stats.leaf_evaluations += 1
+            stats.horizon_leaves += not game_over
+        # A finished game is evaluated by its score alone
+        if evaluator is not None and not game_over:
+            score = evaluator.evaluate_game(game, game.get_current_player())
+        return score * count**depth
+
+    if stats is not None:
+        stats.expanded_nodes += 1
+
+    dice_values = sample_dice_values(count, dice_samples)
+    # Number of dice values each searched one stands for
+    weight = count / len(dice_values)
+    if depth == 2 and evaluator is not None:
+        evaluator.prefetch(game, dice_values, free_columns(game, game.get_current_player()))
+    if depth == 1 and evaluator is not None:
+        # Every leaf is evaluated anyway, the exact value is cheaper than any pruning
+        columns = free_columns(game, game.get_current_player())
+        leaf_values = evaluate_children(
+            game, dice_values, columns, game.get_current_player(), evaluator
+        )
+        if tablebase is not None:
+            leaf_values = probe_children(
+                game, dice_values, columns, leaf_values, tablebase, stats
+            )
+        if stats is not None:
+            for _ in range(leaf_values.size):
+                stats.visit(0)
+            stats.leaf_evaluations += leaf_values.size
+            # Not checked for the end of the game, counted as cut off
+            stats.horizon_leaves += leaf_values.size
+            stats.children += leaf_values.size
+        total = float(leaf_values.max(axis=1).sum())
+        if len(dice_values) < count:
+            total *= weight
+        tt[key] = {"value": total, "flag": "EXACT", "depth": depth}
+        return total
+
+    # Bounds of the value of each dice value, at the scale of the children
+    # Each ply moves the score difference by at most `change` in favour of the player who moves
+    change = game.get_max_score_change()
+    max_score = game.get_max_score()
+    scale = count ** (depth - 1)
+    bound = min(score + (depth + 1) // 2 * change, max_score) * scale
+    lower_bound = max(score - depth // 2 * change, -max_score) * scale
+    if tablebase is not None:
+        bound, lower_bound = max_score * scale, -max_score * scale
+    columns = free_columns(game, game.get_current_player())
+    ordered_columns = [columns] * count
+    # Nothing to order by until a cutoff is recorded
+    if history:
+        signatures = column_signatures(game)
+        ordered_columns = [
+            order_columns(signatures, index + 1, columns, history)
+            for index in range(count)
+        ]
+
+    if len(dice_values) < count:
+        total = 0
+        for dice_value in dice_values:
+            value, _ = max_node(
+                game,
+                dice_value,
+                ordered_columns[dice_value - 1],
+                float("-inf"),
+                float("inf"),
+                depth,
+                tt,
+                pruning,
+                deadline,
+                stats,
+                history,
+                evaluator,
+                dice_samples,
+                tablebase,
+            )
+            total += value
+        total *= weight
+        tt[key] = {"value": total, "flag": "EXACT", "depth": depth}
+        return total
+
+    # Lower bound of the value of each dice value
+    lower_bounds = [lower_bound] * count
+    # At depth 1 the probe would evaluate the same leaves as the search itself
+    if pruning == "star2" and beta < float("inf") and depth >= 2:
+        # Probe: the first column alone gives a lower bound for every dice value
+        lower_total = lower_bound * count
+        for index in range(count):
+            needed = beta - (lower_total - lower_bounds[index])
+            if needed > lower_bounds[index]:
+                probe, _ = max_node(
+                    game,
+                    index + 1,
+                    ordered_columns[index][:1],
+                    lower_bound,
+                    min(needed, bound),
+                    depth,
+                    tt,
+                    pruning,
+                    deadline,
+                    stats,
+                    history,
+                    evaluator,
+                    dice_samples,
+                    tablebase,
+                )
+                lower_total += max(probe, lower_bounds[index]) - lower_bounds[index]
+                lower_bounds[index] = max(probe, lower_bounds[index])
+            if lower_total >= beta:
+                if stats is not None:
+                    stats.chance_cutoffs += 1
+                tt[key] = {"value": lower_total, "flag": "LOWERBOUND", "depth": depth}
+                return lower_total
+
+    total = 0
+    flag = "EXACT"
+    remaining_lower = sum(lower_bounds)
+    for index in range(count):
+        remaining_lower -= lower_bounds[index]
+        remaining_upper = (count - index - 1) * bound
+        if pruning is None:
+            child_alpha, child_beta = float("-inf"), float("inf")
+            window = (child_alpha, child_beta)
+        else:
+            # Star1: window outside of which the sum can no longer be in (alpha, beta)
+            child_alpha = alpha - total - remaining_upper
+            child_beta = beta - total - remaining_lower
+            window = (max(child_alpha, lower_bounds[index]), min(child_beta, bound))
+
+        if window[0] < window[1]:
+            value, _ = max_node(
+                game,
+                index + 1,
+                ordered_columns[index],
+                *window,
+                depth,
+                tt,
+                pruning,
+                deadline,
+                stats,
+                history,
+                evaluator,
+                dice_samples,
+                tablebase,
+            )
+        else:
+            # The known bounds of this dice value are enough to cut
+            value = lower_bounds[index] if child_beta <= lower_bounds[index] else bound
+        if value <= child_alpha:
+            total += value + remaining_upper
+            flag = "UPPERBOUND"
+        elif value >= child_beta:
+            total += value + remaining_lower
+            flag = "LOWERBOUND"
+        if flag != "EXACT":
+            if stats is not None:
+                stats.chance_cutoffs += 1
+            break
+        # A fail low on the probed lower bound means the value is that bound
+        total += max(value, lower_bounds[index])
+
+    tt[key] = {"value": total, "flag": flag, "depth": depth}
+    return total
+
+
+def max_node(
+    game: object,
+    dice_value: int,
+    columns: list[int],
+    alpha: float,
+    beta: float,
+    depth: int,
+    tt: dict | TranspositionTable,
+    pruning: str | None = "star2",
+    deadline: float | None = None,
+    stats: SearchStats | None = None,
+    history: dict | None = None,
+    evaluator: BatchedEvaluator | None = None,
+    dice_samples: int | None = None,
+    tablebase: Tablebase | None = None,
+) -> tuple[float, int]:
+    """Best value and column of the player to move for a known dice value."""
+    best_value, best_column = float("-inf"), columns[0]
+    for column in columns:
+        token = game.play(column, dice_value)
+        if stats is not None:
+            stats.children += 1
+
+        child_alpha = alpha if pruning is None else max(alpha, best_value)
+        value = -expectimax(
+            game,
+            -beta,
+            -child_alpha,
+            depth - 1,
+            tt,
+            pruning,
+            deadline,
+            stats,
+            history,
+            evaluator,
+            dice_samples,
+            tablebase,
+        )
+        game.undo(token)
+        if value > best_value:
+            best_value, best_column = value, column
+        if best_value >= beta:
+            if stats is not None:
+                stats.alpha_beta_cutoffs += 1
+            if history is not None:
+                key = history_key(column_signatures(game), dice_value, column)
+                history[key] = history.get(key, 0) + depth * depth
+            break
+
+    return best_value, best_column
@@ -0,0 +1,179 @@
+import argparse
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"KBOB"
+# Version 1 files did not record the algorithm, the byte was zero, i.e. "negamax"
+VERSION = 2
+
+# magic, version, columns, rows, max dice value, plies, search depth, algorithm, entries
+HEADER = struct.Struct("<4sHBBBBBB4xQ")
+RECORD_DTYPE = np.dtype([("key", "<u8"), ("move", "u1"), ("value", "<f4")])
+# Stored by index, in the order of src.negamax.ALGORITHMS
+ALGORITHMS = ("negamax", "expectimax", "star1", "star2")
+
+
+class OpeningBook:
+    """Best move and value of the first positions of a game, keyed by canonical key.
+
+    The moves are stored in the canonical frame, so one entry serves every position that
+    only differs by the order of the columns or of the dice inside a column. The values
+    have the meaning of the `algorithm` the book was searched with, see `matches`.
+    """
+
+    def __init__(
+        self, filename: str, columns_number: int, rows_number: int, max_dice_value: int
+    ):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{filename} is not an opening book file")
+
+        magic, version, *dimensions, plies, depth, algorithm, count = HEADER.unpack(
+            header
+        )
+        dimensions = tuple(dimensions)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not an opening book file")
+        if version not in (1, VERSION):
+            raise ValueError(f"{filename} has version {version}, expected version {VERSION}")
+        if algorithm >= len(ALGORITHMS):
+            raise ValueError(f"{filename} was searched with an unknown algorithm {algorithm}")
+        if dimensions != (columns_number, rows_number, max_dice_value):
+            raise ValueError(
+                f"{filename} was built for a {dimensions} game, not {(columns_number, rows_number, max_dice_value)}"
+            )
+
+        self.plies = plies
+        self.depth = depth
+        self.algorithm = ALGORITHMS[algorithm]
+        self.records = np.fromfile(filename, dtype=RECORD_DTYPE, offset=HEADER.size)
+        # Copied once so that the lookups search contiguous keys
+        self.keys = np.ascontiguousarray(self.records["key"])
+
+    def matches(self, algorithm: str) -> bool:
+        """True if the book values mean the same as the ones of `algorithm`: the negamax
+        value, or the expected value that every other algorithm computes exactly."""
+        return (self.algorithm == "negamax") == (algorithm == "negamax")
+
+    def get(self, game: object) -> tuple[int, float] | None:
+        """Best move and value of the position with its dice value, None if not in the book."""
+        if len(self.records) == 0:
+            return None
+        # A NumPy key keeps the search on the keys, without converting them
+        key = np.uint64(game.encode_canonical_key())
+        index = int(np.searchsorted(self.keys, key))
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        record = self.records[index]
+        return game.canonical_to_column(int(record["move"])), float(record["value"])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def opening_positions(
+    columns_number: int, rows_number: int, max_dice_value: int, plies: int
+) -> list:
+    """One game per canonical position of the first `plies` plies, with every dice value."""
+    import knucklebones_rust as kb
+
+    layer = {}
+    empty_game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
+    for dice_value in range(1, max_dice_value + 1):
+        game = empty_game.copy()
+        game.set_dice_value(dice_value)
+        layer[game.encode_canonical_key()] = game
+
+    positions = dict(layer)
+    for _ in range(plies - 1):
+        next_layer = {}
+        for game in layer.values():
+            for column in game.get_available_columns(game.get_current_player()):
+                for dice_value in range(1, max_dice_value + 1):
+                    child = game.copy()
+                    child.make_move(column, dice_value)
+                    if not child.is_game_over():
+                        next_layer.setdefault(child.encode_canonical_key(), child)
+        positions.update(next_layer)
+        layer = next_layer
+    return list(positions.values())
+
+
+def build_opening_book(
+    filename: str,
+    plies: int = 3,
+    depth: int = 6,
+    algorithm: str = "negamax",
+    threads: int = 0,
+    columns_number: int = 3,
+    rows_number: int = 3,
+    max_dice_value: int = 6,
+) -> OpeningBook:
+    """Search every opening position with the native search and write the book file."""
+    import knucklebones_rust as kb
+
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {ALGORITHMS}")
+
+    table = kb.SearchTable()
+    records = []
+    positions = opening_positions(columns_number, rows_number, max_dice_value, plies)
+    start = time.perf_counter()
+    for index, game in enumerate(positions):
+        move, value, _ = game.best_move(depth, table, algorithm, threads)
+        records.append((game.encode_canonical_key(), game.column_to_canonical(move), value))
+        if (index + 1) % 100 == 0:
+            print(
+                f"{index + 1}/{len(positions)} positions, {time.perf_counter() - start:.1f}s"
+            )
+
+    records = np.array(sorted(records), dtype=RECORD_DTYPE)
+    with open(filename, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                columns_number,
+                rows_number,
+                max_dice_value,
+                plies,
+                depth,
+                ALGORITHMS.index(algorithm),
+                len(records),
+            )
+        )
+        f.write(records.tobytes())
+    return OpeningBook(filename, columns_number, rows_number, max_dice_value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the opening book")
+    parser.add_argument("-o", "--output", default="opening.bin")
+    parser.add_argument("-p", "--plies", type=int, default=3)
+    parser.add_argument("-d", "--depth", type=int, default=6)
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="negamax")
+    parser.add_argument("-t", "--threads", type=int, default=0, help="0 for every core")
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--max-dice-value", type=int, default=6)
+    args = parser.parse_args()
+
+    book = build_opening_book(
+        args.output,
+        plies=args.plies,
+        depth=args.depth,
+        algorithm=args.algorithm,
+        threads=args.threads,
+        columns_number=args.columns,
+        rows_number=args.rows,
+        max_dice_value=args.max_dice_value,
+    )
+    print(f"{len(book)} positions written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import json
+
+from src.transposition import FLAGS
+
+
+class SearchStats:
+    """Counters filled by `get_best_move` and the searches when passed as `stats`.
+
+    Nodes are counted per remaining depth (0 for the leaves). The searches only touch
+    the object behind `if stats is not None`, so a search without stats does no extra work.
+    A timed search fills the same object at every depth, `root_moves` tells them apart.
+    `horizon_leaves` counts the leaves cut off by the depth before the end of the game.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.leaf_evaluations = 0
+        self.horizon_leaves = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = dict.fromkeys(FLAGS, 0)
+        self.tablebase_hits = 0
+        self.alpha_beta_cutoffs = 0
+        self.chance_cutoffs = 0
+        self.expanded_nodes = 0
+        self.children = 0
+        self.root_moves = []
+        self.time = 0.0
+
+    def visit(self, depth: int) -> None:
+        self.nodes[depth] = self.nodes.get(depth, 0) + 1
+
+    def total_nodes(self) -> int:
+        return sum(self.nodes.values())
+
+    def branching_factor(self) -> float:
+        """Average number of children searched per expanded node."""
+        return self.children / self.expanded_nodes if self.expanded_nodes else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "nodes": self.total_nodes(),
+            "nodes_per_depth": {
+                str(depth): self.nodes[depth] for depth in sorted(self.nodes)
+            },
+            "leaf_evaluations": self.leaf_evaluations,
+            "horizon_leaves": self.horizon_leaves,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_cutoffs": dict(self.tt_cutoffs),
+            "tablebase_hits": self.tablebase_hits,
+            "alpha_beta_cutoffs": self.alpha_beta_cutoffs,
+            "chance_cutoffs": self.chance_cutoffs,
+            "branching_factor": self.branching_factor(),
+            "root_moves": list(self.root_moves),
+            "time": self.time,
+        }
+
+    def to_json(self, filename: str | None = None) -> str:
+        """JSON export of `to_dict`, also written to `filename` if given."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if filename is not None:
+            with open(filename, "w") as f:
+                f.write(text + "\n")
+        return text
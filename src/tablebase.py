@@ -0,0 +1,253 @@
+import argparse
+import random
+import struct
+import os
+
+import numpy as np
+
+MAGIC = b"KBEG"
+# Version 1 files stored (key, value) records instead of the keys then the values
+VERSION = 2
+
+# magic, version, columns, rows, max dice value, empty cells, entries
+HEADER = struct.Struct("<4sHBBBB6xQ")
+RECORD_DTYPE = np.dtype([("key", "<u8"), ("value", "<f4")])
+
+DEFAULT_MIN_PROBABILITY = 1e-4
+DEFAULT_MAX_ERROR = 1e-3
+
+
+class Tablebase:
+    """Endgame values indexed by position key, read from a file written by `write_tablebase`.
+
+    The sorted keys and then their values are memory-mapped, a lookup is a binary search
+    on the contiguous keys that only faults in the pages it reads. A value
+    is the expected final score difference for the player to move, before their dice is
+    rolled, the exact version of what the expectimax searches compute for a position key
+    (before their `max_dice_value ** depth` scaling).
+    """
+
+    def __init__(
+        self, filename: str, columns_number: int, rows_number: int, max_dice_value: int
+    ):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{filename} is not an endgame tablebase file")
+
+        magic, version, *dimensions, empty_cells, count = HEADER.unpack(header)
+        dimensions = tuple(dimensions)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not an endgame tablebase file")
+        if version not in (1, VERSION):
+            raise ValueError(f"{filename} has version {version}, expected version {VERSION}")
+        if dimensions != (columns_number, rows_number, max_dice_value):
+            raise ValueError(
+                f"{filename} was built for a {dimensions} game, not {(columns_number, rows_number, max_dice_value)}"
+            )
+
+        self.empty_cells = empty_cells
+        self.keys = None
+        self.values = None
+        if count > 0 and version == 1:
+            records = np.memmap(
+                filename, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,)
+            )
+            # Copied once so that the lookups search contiguous keys
+            self.keys = np.array(records["key"])
+            self.values = np.array(records["value"])
+        elif count > 0:
+            self.keys = np.memmap(
+                filename, dtype="<u8", mode="r", offset=HEADER.size, shape=(count,)
+            )
+            self.values = np.memmap(
+                filename,
+                dtype="<f4",
+                mode="r",
+                offset=HEADER.size + 8 * count,
+                shape=(count,),
+            )
+
+    def get(self, key: int, default=None):
+        if self.keys is None:
+            return default
+        # A NumPy key keeps the search on the mapped keys, without converting them
+        key = np.uint64(key)
+        index = int(np.searchsorted(self.keys, key))
+        if index < len(self.keys) and self.keys[index] == key:
+            return float(self.values[index])
+        return default
+
+    def best_move(self, game: object) -> tuple[int, float] | None:
+        """Best column for the rolled dice and its expected value, if every column leads
+        to a solved position or ends the game, else None."""
+        game = game.copy()
+        dice_value = game.get_dice_value()
+        best = None
+        for column in game.get_available_columns(game.get_current_player()):
+            token = game.play(column, dice_value)
+            if game.is_game_over():
+                value = game.get_heuristic_score(game.get_current_player())
+            else:
+                value = self.get(game.encode_position_key())
+            game.undo(token)
+            if value is None:
+                return None
+            # The value is for the player to move in the child
+            if best is None or -value > best[1]:
+                best = (column, -float(value))
+        return best
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return 0 if self.keys is None else len(self.keys)
+
+
+def write_tablebase(
+    filename: str,
+    entries: dict,
+    columns_number: int,
+    rows_number: int,
+    max_dice_value: int,
+    empty_cells: int,
+) -> None:
+    records = np.array(sorted(entries.items()), dtype=RECORD_DTYPE)
+    with open(filename, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                columns_number,
+                rows_number,
+                max_dice_value,
+                empty_cells,
+                len(records),
+            )
+        )
+        f.write(np.ascontiguousarray(records["key"]).tobytes())
+        f.write(np.ascontiguousarray(records["value"]).tobytes())
+
+
+def solve_endgame(
+    game: object, probability: float, min_probability: float, solved: dict
+) -> tuple[float, float]:
+    """Expected final score difference for the player to move, before their dice is rolled.
+
+    The game is played to its end for every dice roll, except the continuations less
+    likely than `min_probability`, which are evaluated with the heuristic. Dice removed by
+    the other player can make a game last forever, so they cannot all be played. Also
+    returns the probability mass of those cut continuations, the value is off by at most
+    that mass times twice the highest score.
+    """
+    key = game.encode_position_key()
+    entry = solved.get(key)
+    # An entry solved from a more likely path was searched at least as far
+    if entry is not None and entry[2] >= probability:
+        return entry[0], entry[1]
+
+    if game.is_game_over():
+        return game.get_heuristic_score(game.get_current_player()), 0.0
+    if probability < min_probability:
+        return game.get_heuristic_score(game.get_current_player()), 1.0
+
+    count = game.get_max_dice_value()
+    columns = game.get_available_columns(game.get_current_player())
+    total = 0.0
+    error = 0.0
+    for dice_value in range(1, count + 1):
+        best_value = float("-inf")
+        worst_error = 0.0
+        for column in columns:
+            copy_game = game.copy()
+            copy_game.set_dice_value(dice_value)
+            copy_game.place_dice(column)
+            value, child_error = solve_endgame(
+                copy_game, probability / count, min_probability, solved
+            )
+            best_value = max(best_value, -value)
+            worst_error = max(worst_error, child_error)
+        total += best_value
+        error += worst_error
+
+    elements = game.get_number_of_elements(game.get_current_player())
+    solved[key] = (total / count, error / count, probability, elements)
+    return total / count, error / count
+
+
+def generate_tablebase(
+    filename: str,
+    games: int = 1000,
+    empty_cells: int = 2,
+    min_probability: float = DEFAULT_MIN_PROBABILITY,
+    max_error: float = DEFAULT_MAX_ERROR,
+    columns_number: int = 3,
+    rows_number: int = 3,
+    max_dice_value: int = 6,
+    seed: int = 0,
+) -> Tablebase:
+    """Solve the endgames of seeded random games and write the tablebase file.
+
+    Every position of the games where the player to move has at most `empty_cells` free
+    cells is solved, along with the positions met while solving it. The positions whose
+    cut probability mass is at most `max_error` are kept.
+    """
+    import knucklebones_rust as kb
+
+    cells = columns_number * rows_number
+    rng = random.Random(seed)
+    solved = {}
+    for game_index in range(games):
+        game = kb.Knucklebones(
+            columns_number, rows_number, max_dice_value, (seed << 32) + game_index
+        )
+        while not game.is_game_over():
+            player = game.get_current_player()
+            if cells - game.get_number_of_elements(player) <= empty_cells:
+                solve_endgame(game, 1.0, min_probability, solved)
+            game.make_move(rng.choice(game.get_available_columns(player)))
+
+    entries = {
+        key: value
+        for key, (value, error, _, elements) in solved.items()
+        if cells - elements <= empty_cells and error <= max_error
+    }
+    write_tablebase(
+        filename, entries, columns_number, rows_number, max_dice_value, empty_cells
+    )
+    return Tablebase(filename, columns_number, rows_number, max_dice_value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate the endgame tablebase")
+    parser.add_argument("-o", "--output", default="endgame.bin")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-k", "--empty-cells", type=int, default=2)
+    parser.add_argument("--min-probability", type=float, default=DEFAULT_MIN_PROBABILITY)
+    parser.add_argument("--max-error", type=float, default=DEFAULT_MAX_ERROR)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--max-dice-value", type=int, default=6)
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    tablebase = generate_tablebase(
+        args.output,
+        games=args.games,
+        empty_cells=args.empty_cells,
+        min_probability=args.min_probability,
+        max_error=args.max_error,
+        columns_number=args.columns,
+        rows_number=args.rows,
+        max_dice_value=args.max_dice_value,
+        seed=args.seed,
+    )
+    print(f"{len(tablebase)} positions written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import concurrent.futures
+import argparse
+import random
+import json
+import math
+import time
+import csv
+import os
+
+import knucklebones_rust as kb
+
+from src.negamax import get_best_move
+from src.mcts import MCTS
+
+AGENT_KINDS = ("random", "negamax", "reference", "timed", "mcts", "mcts_timed")
+
+
+def parse_agent(spec: str) -> tuple[str, int | float | None]:
+    """Parse an agent spec: "random", "negamax:3" (native search), "reference:2"
+    (Python search), "timed:0.5" (native iterative deepening, in seconds), "mcts:1000"
+    (MCTS playouts per move) or "mcts_timed:0.5" (MCTS, in seconds)."""
+    kind, _, parameter = spec.partition(":")
+    if kind not in AGENT_KINDS:
+        raise ValueError(f"Unknown agent {spec!r}, expected one of {AGENT_KINDS}")
+    if kind == "random":
+        return kind, None
+    if not parameter:
+        raise ValueError(f"Agent {spec!r} needs a parameter, e.g. {kind}:3")
+    return kind, float(parameter) if kind.endswith("timed") else int(parameter)
+
+
+def new_table(agent: tuple[str, int | float | None], seed: int) -> object:
+    """State an agent keeps between its moves: its table, or its tree for MCTS."""
+    kind, parameter = agent
+    if kind == "reference":
+        return {}
+    if kind in ("negamax", "timed"):
+        return kb.SearchTable()
+    if kind == "mcts":
+        return MCTS(playouts=parameter, seed=seed)
+    if kind == "mcts_timed":
+        return MCTS(playouts=None, time_budget=parameter, seed=seed)
+    return None
+
+
+def choose_move(
+    agent: tuple[str, int | float | None], game: object, rng: random.Random, table
+) -> int:
+    kind, parameter = agent
+    if kind == "random":
+        return rng.choice(game.get_available_columns(game.get_current_player()))
+    if kind == "negamax":
+        return game.best_move(parameter, table)[0]
+    if kind == "timed":
+        return game.best_move_timed(parameter, table)[0]
+    if kind in ("mcts", "mcts_timed"):
+        return table.get_best_move(game)[0]
+    return get_best_move(game, parameter, table)[0]
+
+
+def play_game(
+    agent_a: str,
+    agent_b: str,
+    game_index: int,
+    seed: int,
+    columns_number: int = 3,
+    rows_number: int = 3,
+    max_dice_value: int = 6,
+) -> dict:
+    """Play one headless game, the dice and the random agents only use the game seed."""
+    rng = random.Random(seed)
+    game = kb.Knucklebones(columns_number, rows_number, max_dice_value, seed)
+
+    # The agents swap seats every game so that neither always plays first
+    seat_a = game_index % 2
+    specs = [agent_a, agent_b] if seat_a == 0 else [agent_b, agent_a]
+    agents = [parse_agent(spec) for spec in specs]
+    tables = [new_table(agent, seed + seat) for seat, agent in enumerate(agents)]
+    move_times = [[], []]
+
+    turns = 0
+    while not game.is_game_over():
+        player = game.get_current_player()
+        start = time.perf_counter()
+        column = choose_move(agents[player], game, rng, tables[player])
+        move_times[player].append(time.perf_counter() - start)
+
+        game.make_move(column)
+        turns += 1
+
+    score_a = game.get_score(seat_a)
+    score_b = game.get_score(1 - seat_a)
+    if score_a > score_b:
+        winner = "a"
+    elif score_b > score_a:
+        winner = "b"
+    else:
+        winner = "draw"
+
+    times_a = move_times[seat_a]
+    times_b = move_times[1 - seat_a]
+    return {
+        "game": game_index,
+        "seed": seed,
+        "agent_a": agent_a,
+        "agent_b": agent_b,
+        "seat_a": seat_a,
+        "winner": winner,
+        "score_a": score_a,
+        "score_b": score_b,
+        "turns": turns,
+        "time_per_move_a": sum(times_a) / len(times_a) if times_a else 0.0,
+        "time_per_move_b": sum(times_b) / len(times_b) if times_b else 0.0,
+    }
+
+
+def run_tournament(
+    agent_a: str,
+    agent_b: str,
+    games: int,
+    output: str | None = None,
+    seed: int = 0,
+    workers: int | None = None,
+    columns_number: int = 3,
+    rows_number: int = 3,
+    max_dice_value: int = 6,
+) -> dict:
+    """Play `games` games between two agents on a process pool.
+
+    Results are streamed to `output` (CSV or JSONL depending on the extension) as games
+    finish, and the summary statistics are returned.
+    """
+    # Fail before starting the pool on an invalid spec
+    parse_agent(agent_a)
+    parse_agent(agent_b)
+
+    results = []
+    output_file = open(output, "w", newline="") if output else None
+    writer = None
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    play_game,
+                    agent_a,
+                    agent_b,
+                    game_index,
+                    (seed << 32) + game_index,
+                    columns_number,
+                    rows_number,
+                    max_dice_value,
+                )
+                for game_index in range(games)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if output_file is None:
+                    continue
+                if output.endswith(".csv"):
+                    if writer is None:
+                        writer = csv.DictWriter(output_file, fieldnames=list(result))
+                        writer.writeheader()
+                    writer.writerow(result)
+                else:
+                    output_file.write(json.dumps(result) + "\n")
+                output_file.flush()
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    return summarize(results)
+
+
+def confidence_interval(values: list[float], z: float = 1.96) -> tuple[float, float]:
+    """Mean and half-width of the normal confidence interval (95% by default)."""
+    n = len(values)
+    if n == 0:
+        return 0.0, 0.0
+    mean = sum(values) / n
+    if n == 1:
+        return mean, 0.0
+    variance = sum((value - mean) ** 2 for value in values) / (n - 1)
+    return mean, z * math.sqrt(variance / n)
+
+
+def summarize(results: list[dict]) -> dict:
+    # A draw counts as half a win
+    points = [
+        {"a": 1.0, "b": 0.0, "draw": 0.5}[result["winner"]] for result in results
+    ]
+    score_a, score_a_error = confidence_interval(points)
+    difference, difference_error = confidence_interval(
+        [result["score_a"] - result["score_b"] for result in results]
+    )
+    return {
+        "games": len(results),
+        "wins_a": sum(result["winner"] == "a" for result in results),
+        "wins_b": sum(result["winner"] == "b" for result in results),
+        "draws": sum(result["winner"] == "draw" for result in results),
+        "score_a": score_a,
+        "score_a_error": score_a_error,
+        "score_difference": difference,
+        "score_difference_error": difference_error,
+        "turns": confidence_interval([result["turns"] for result in results])[0],
+        "time_per_move_a": confidence_interval(
+            [result["time_per_move_a"] for result in results]
+        )[0],
+        "time_per_move_b": confidence_interval(
+            [result["time_per_move_b"] for result in results]
+        )[0],
+    }
+
+
+def print_summary(summary: dict, agent_a: str, agent_b: str) -> None:
+    print(f"{agent_a} vs {agent_b}: {summary['games']} games")
+    print(
+        f"Wins: {summary['wins_a']} / {summary['wins_b']}, draws: {summary['draws']}"
+    )
+    print(
+        f"Score of {agent_a}: {summary['score_a']:.3f} ± {summary['score_a_error']:.3f}"
+    )
+    print(
+        f"Score difference: {summary['score_difference']:.2f} ± {summary['score_difference_error']:.2f}"
+    )
+    print(f"Turns per game: {summary['turns']:.1f}")
+    print(
+        f"Time per move: {summary['time_per_move_a'] * 1000:.2f} ms / {summary['time_per_move_b'] * 1000:.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless Knucklebones tournament")
+    parser.add_argument("agent_a", help='e.g. "random", "negamax:3", "timed:0.1"')
+    parser.add_argument("agent_b", help='e.g. "random", "negamax:3", "timed:0.1"')
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-o", "--output", help="results file, .csv or .jsonl")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--max-dice-value", type=int, default=6)
+    args = parser.parse_args()
+
+    summary = run_tournament(
+        args.agent_a,
+        args.agent_b,
+        args.games,
+        output=args.output,
+        seed=args.seed,
+        workers=args.workers,
+        columns_number=args.columns,
+        rows_number=args.rows,
+        max_dice_value=args.max_dice_value,
+    )
+    print_summary(summary, args.agent_a, args.agent_b)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+from array import array
+
+EMPTY = 255
+FLAGS = ("EXACT", "LOWERBOUND", "UPPERBOUND")
+FLAG_CODES = {flag: code for code, flag in enumerate(FLAGS)}
+
+# key (8 bytes) + value (8 bytes) + flag (1 byte) + depth (1 byte) + move (1 byte)
+# + dirty (1 byte)
+ENTRY_SIZE = 20
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+REPLACEMENT_POLICIES = ("depth", "always")
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+class TranspositionTable:
+    """Fixed-size transposition table, a drop-in replacement for the plain dict used by negamax.
+
+    Entries are packed in parallel arrays and grouped in buckets of `bucket_size` slots.
+    When a bucket is full, the shallowest entry is evicted: with the "depth" policy only
+    if the new entry is at least as deep, with the "always" policy unconditionally.
+    An optional `backing` table (e.g. a TTFile) is probed on misses and receives the
+    entries stored since the last `flush`. The optional "move" of an entry (below 255) is
+    kept in memory only. The entry returned by `get` is one dict refilled by every hit, so
+    the probes allocate nothing; it must be read before the next probe, not kept or changed.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        bucket_size: int = 4,
+        replacement: str = "depth",
+        backing=None,
+    ):
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(
+                f"Unknown replacement policy {replacement!r}, expected one of {REPLACEMENT_POLICIES}"
+            )
+        self.bucket_size = bucket_size
+        self.buckets_number = max(1, memory_budget // (ENTRY_SIZE * bucket_size))
+        self.replacement = replacement
+
+        size = self.buckets_number * bucket_size
+        self.keys = array("Q", bytes(8 * size))
+        self.values = array("d", bytes(8 * size))
+        self.flags = array("B", [EMPTY]) * size
+        self.depths = array("B", bytes(size))
+        self.moves = array("B", [EMPTY]) * size
+        self.dirty = array("B", bytes(size))
+        self.size = 0
+        self.backing = backing
+
+        self.hits = 0
+        self.misses = 0
+        # Misses in a bucket holding other positions, the evictions are the overwrites
+        self.shared_bucket_misses = 0
+        self.overwrites = 0
+        self.hit_entry = {}
+
+    def _bucket(self, key: int) -> int:
+        return ((key * _HASH_MULTIPLIER) & _MASK_64) % self.buckets_number * self.bucket_size
+
+    def _find(self, key: int) -> int:
+        start = self._bucket(key)
+        for slot in range(start, start + self.bucket_size):
+            if self.flags[slot] != EMPTY and self.keys[slot] == key:
+                return slot
+        return -1
+
+    def get(self, key: int, default=None):
+        slot = self._find(key)
+        if slot < 0 and self.backing is not None:
+            entry = self.backing.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._store(key, entry, dirty=False)
+                return entry
+        if slot < 0:
+            self.misses += 1
+            # The bucket is shared with other positions
+            start = self._bucket(key)
+            if any(self.flags[s] != EMPTY for s in range(start, start + self.bucket_size)):
+                self.shared_bucket_misses += 1
+            return default
+
+        self.hits += 1
+        entry = self.hit_entry
+        entry["value"] = self.values[slot]
+        entry["flag"] = FLAGS[self.flags[slot]]
+        entry["depth"] = self.depths[slot]
+        if self.moves[slot] != EMPTY:
+            entry["move"] = self.moves[slot]
+        elif "move" in entry:
+            del entry["move"]
+        return entry
+
+    def _entry(self, slot: int) -> dict:
+        entry = {
+            "value": self.values[slot],
+            "flag": FLAGS[self.flags[slot]],
+            "depth": self.depths[slot],
+        }
+        if self.moves[slot] != EMPTY:
+            entry["move"] = self.moves[slot]
+        return entry
+
+    def __getitem__(self, key: int) -> dict:
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return dict(entry)
+
+    def __setitem__(self, key: int, entry: dict) -> None:
+        self._store(key, entry, dirty=True)
+
+    def _store(self, key: int, entry: dict, dirty: bool) -> None:
+        depth = min(entry["depth"], 254)
+        slot = self._find(key)
+        if slot < 0:
+            start = self._bucket(key)
+            slot = start
+            for candidate in range(start, start + self.bucket_size):
+                if self.flags[candidate] == EMPTY:
+                    slot = candidate
+                    break
+                if self.depths[candidate] < self.depths[slot]:
+                    slot = candidate
+
+            if self.flags[slot] == EMPTY:
+                self.size += 1
+            elif self.replacement == "depth" and self.depths[slot] > depth:
+                return
+            else:
+                self.overwrites += 1
+
+        self.keys[slot] = key
+        self.values[slot] = entry["value"]
+        self.flags[slot] = FLAG_CODES[entry["flag"]]
+        self.depths[slot] = depth
+        self.moves[slot] = entry.get("move", EMPTY)
+        self.dirty[slot] = dirty
+
+    def __contains__(self, key: int) -> bool:
+        return self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def items(self):
+        for slot in range(len(self.flags)):
+            if self.flags[slot] != EMPTY:
+                yield self.keys[slot], self._entry(slot)
+
+    def update(self, entries) -> None:
+        if isinstance(entries, dict):
+            entries = entries.items()
+        for key, entry in entries:
+            self[key] = entry
+
+    def dirty_items(self):
+        """Entries stored since the last call, their dirty mark is cleared."""
+        for slot in range(len(self.flags)):
+            if self.dirty[slot] and self.flags[slot] != EMPTY:
+                self.dirty[slot] = 0
+                yield self.keys[slot], self._entry(slot)
+
+    def flush(self) -> None:
+        if self.backing is not None:
+            self.backing.append(self.dirty_items())
+
+    def clear(self) -> None:
+        size = len(self.flags)
+        self.flags = array("B", [EMPTY]) * size
+        self.dirty = array("B", bytes(size))
+        self.size = 0
+
+    def memory_usage(self) -> int:
+        return len(self.flags) * ENTRY_SIZE
+
+    def stats(self) -> dict:
+        return {
+            "entries": self.size,
+            "capacity": len(self.flags),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_bucket_misses": self.shared_bucket_misses,
+            "overwrites": self.overwrites,
+        }
@@ -0,0 +1,241 @@
+import pickle
+import struct
+import os
+
+import numpy as np
+
+from src.transposition import FLAG_CODES, FLAGS
+
+MAGIC = b"KBTT"
+# Version 1 files had no separate key section, they are converted when opened
+VERSION = 2
+
+# magic, version, columns, rows, max dice value, sorted records, total records
+HEADER = struct.Struct("<4sHBBB7xQQ")
+RECORD_DTYPE = np.dtype(
+    [("key", "<u8"), ("value", "<f8"), ("flag", "u1"), ("depth", "u1")]
+)
+
+
+class TTFile:
+    """Transposition table stored on disk as fixed-width records behind a small header.
+
+    The header is followed by the keys of the first `sorted_count` records, sorted and
+    contiguous, then by every record. Both are memory-mapped, so opening the file is
+    instant and a lookup is a binary search on the keys that only faults in the pages it
+    reads. New entries are appended after the records and kept in memory until `compact`
+    merges them. A key with several records is worth its deepest one, the latest of the
+    deepest ones, wherever they are stored.
+    """
+
+    def __init__(
+        self, filename: str, columns_number: int, rows_number: int, max_dice_value: int
+    ):
+        self.filename = filename
+        self.dimensions = (columns_number, rows_number, max_dice_value)
+
+        if not os.path.exists(filename):
+            with open(filename, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, *self.dimensions, 0, 0))
+
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.filename, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{self.filename} is not a transposition table file")
+
+        magic, version, *dimensions, sorted_count, record_count = HEADER.unpack(header)
+        dimensions = tuple(dimensions)
+        if magic != MAGIC:
+            raise ValueError(f"{self.filename} is not a transposition table file")
+        if version not in (1, VERSION):
+            raise ValueError(
+                f"{self.filename} has version {version}, expected version {VERSION}"
+            )
+        if dimensions != self.dimensions:
+            raise ValueError(
+                f"{self.filename} was built for a {dimensions} game, not {self.dimensions}"
+            )
+
+        self.sorted_count = sorted_count
+        self.record_count = record_count
+        self.keys = None
+        self.records = None
+        # Version 1 files have no key section, compact rewrites them below
+        has_keys = version == VERSION
+        records_offset = HEADER.size + (8 * sorted_count if has_keys else 0)
+        if sorted_count > 0 and has_keys:
+            self.keys = np.memmap(
+                self.filename,
+                dtype="<u8",
+                mode="r",
+                offset=HEADER.size,
+                shape=(sorted_count,),
+            )
+        if record_count > 0:
+            self.records = np.memmap(
+                self.filename,
+                dtype=RECORD_DTYPE,
+                mode="r",
+                offset=records_offset,
+                shape=(record_count,),
+            )
+        if not has_keys and self.records is not None:
+            self.compact()
+            return
+
+        # The appended tail is small, a later record replaces one at most as deep
+        self.tail = {}
+        if self.records is not None:
+            for record in self.records[sorted_count:]:
+                _keep_deepest(self.tail, int(record["key"]), _to_entry(record))
+
+    def get(self, key: int, default=None):
+        entry = self.tail.get(key)
+        if self.sorted_count > 0:
+            # A NumPy key keeps the search on the mapped keys, without converting them
+            key_value = np.uint64(key)
+            index = int(np.searchsorted(self.keys, key_value))
+            if index < self.sorted_count and self.keys[index] == key_value:
+                sorted_entry = _to_entry(self.records[index])
+                # The tail is newer, it wins a tie
+                if entry is None or sorted_entry["depth"] > entry["depth"]:
+                    entry = sorted_entry
+        if entry is None:
+            return default
+        return entry
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def append(self, entries) -> None:
+        """Append entries at the end of the file without rewriting it."""
+        if isinstance(entries, dict):
+            entries = entries.items()
+        records = np.array(
+            [
+                (key, entry["value"], FLAG_CODES[entry["flag"]], min(entry["depth"], 255))
+                for key, entry in entries
+            ],
+            dtype=RECORD_DTYPE,
+        )
+        if len(records) == 0:
+            return
+
+        self.keys = self.records = None
+        with open(self.filename, "r+b") as f:
+            f.seek(
+                HEADER.size
+                + 8 * self.sorted_count
+                + self.record_count * RECORD_DTYPE.itemsize
+            )
+            f.write(records.tobytes())
+            f.seek(0)
+            f.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    *self.dimensions,
+                    self.sorted_count,
+                    self.record_count + len(records),
+                )
+            )
+        self._open()
+
+        # Merge once the unsorted tail is as large as the sorted part
+        if len(self.tail) > max(self.sorted_count, 1024):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the file with every record sorted, keeping the deepest entry per key."""
+        if self.records is None:
+            return
+        records = np.array(self.records)
+        # Sort by key, depth then position, the last record of each key is the latest of
+        # the deepest ones, as in `get`
+        order = np.arange(len(records))
+        records = records[np.lexsort((order, records["depth"], records["key"]))]
+        last = np.append(records["key"][1:] != records["key"][:-1], True)
+        records = records[last]
+
+        self.keys = self.records = None
+        temporary = self.filename + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(
+                HEADER.pack(MAGIC, VERSION, *self.dimensions, len(records), len(records))
+            )
+            f.write(np.ascontiguousarray(records["key"]).tobytes())
+            f.write(records.tobytes())
+        os.replace(temporary, self.filename)
+        self._open()
+
+    def items(self):
+        if self.records is None:
+            return
+        entries = {}
+        for record in self.records:
+            _keep_deepest(entries, int(record["key"]), _to_entry(record))
+        yield from entries.items()
+
+
+def _keep_deepest(entries: dict, key: int, entry: dict) -> None:
+    """Store `entry` unless `entries` has a deeper one for `key`."""
+    current = entries.get(key)
+    if current is None or entry["depth"] >= current["depth"]:
+        entries[key] = entry
+
+
+def _to_entry(record) -> dict:
+    return {
+        "value": float(record["value"]),
+        "flag": FLAGS[record["flag"]],
+        "depth": int(record["depth"]),
+    }
+
+
+def convert_pickle_tt(
+    pickle_filename: str,
+    filename: str,
+    columns_number: int = 3,
+    rows_number: int = 3,
+    max_dice_value: int = 6,
+) -> TTFile:
+    """One-time conversion of a pickled `tt.pkl` into the binary format."""
+    import knucklebones_rust as kb
+
+    with open(pickle_filename, "rb") as f:
+        tt = pickle.load(f)
+    if not isinstance(tt, dict):
+        tt = dict(tt.items())
+
+    entries = {}
+    for key, entry in tt.items():
+        if isinstance(key, str):
+            # Tables saved before the integer keys used the encode_game string
+            values = [int(value) for value in key.split(",")]
+            game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
+            cells = columns_number * rows_number
+            for player_index in range(2):
+                for column in range(columns_number):
+                    start = player_index * cells + column * rows_number
+                    for value in values[start : start + rows_number]:
+                        if value != 0:
+                            game.add_value_to_column(column, player_index, value)
+            game.set_current_player(values[-1])
+            key = game.encode_position_key()
+
+        # Several old entries can share a position key, keep the deepest one
+        if key not in entries or entries[key]["depth"] < entry["depth"]:
+            entries[key] = entry
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    tt_file = TTFile(filename, columns_number, rows_number, max_dice_value)
+    tt_file.append(entries)
+    tt_file.compact()
+    return tt_file
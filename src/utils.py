@@ -1,10 +1,22 @@
 import random
-import pickle
 import os
 
 import knucklebones_rust as kb
 
 from src.negamax import get_best_move
+from src.transposition import DEFAULT_MEMORY_BUDGET, TranspositionTable
+from src.tt_storage import TTFile, convert_pickle_tt
+from src.opening_book import OpeningBook
+from src.search_stats import SearchStats
+from src.evaluation import Evaluator
+from src.mcts import MCTS
+from src.tablebase import Tablebase
+
+TT_FILENAME = "tt.bin"
+LEGACY_TT_FILENAME = "tt.pkl"
+TABLEBASE_FILENAME = "endgame.bin"
+OPENING_BOOK_FILENAME = "opening.bin"
+EVALUATION_FILENAME = "evaluation.json"
 
 
 def run_random_game(columns_number: int, rows_number: int, max_dice_value: int) -> int:
@@ -29,14 +41,46 @@ def run_random_game(columns_number: int, rows_number: int, max_dice_value: int)
 
 
 def run_negamax_game(
-    columns_number: int, rows_number: int, max_dice_value: int, depth: int
+    columns_number: int,
+    rows_number: int,
+    max_dice_value: int,
+    depth: int,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    agent: MCTS | None = None,
+    algorithm: str = "negamax",
 ) -> int:
+    """Self-play game of the Python search with `algorithm`, or of `agent` if given. The
+    exact algorithms use the endgame tablebase if there is one."""
     game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
     turn_counter = 0
 
-    tt = load_tt("tt.pkl")
+    evaluator = load_evaluator()
+    tt = load_tt(
+        TT_FILENAME,
+        columns_number,
+        rows_number,
+        max_dice_value,
+        memory_budget,
+        evaluator,
+        algorithm,
+    )
+    book = load_opening_book(columns_number, rows_number, max_dice_value)
+    tablebase = None
+    if algorithm != "negamax":
+        tablebase = load_tablebase(columns_number, rows_number, max_dice_value)
     while not game.is_game_over():
-        best_move, score = get_best_move(game=game, depth=depth, tt=tt)
+        if agent is not None:
+            best_move, score = agent.get_best_move(game)
+        else:
+            best_move, score = get_best_move(
+                game=game,
+                depth=depth,
+                tt=tt,
+                algorithm=algorithm,
+                tablebase=tablebase,
+                book=book,
+                evaluator=evaluator,
+            )
         print(
             f"Current player: {game.get_current_player()}, dice number: {game.get_dice_value()}, best move: {best_move}, score: {score:.2f}"
         )
@@ -50,19 +94,39 @@ def run_negamax_game(
             )
 
     print(f"Game over after {turn_counter} turns")
+    print(f"Transposition table: {tt.stats()}")
 
-    save_tt(tt, "tt.pkl")
+    save_tt(tt)
 
 
 def play_against_negamax(
-    columns_number: int, rows_number: int, max_dice_value: int, depth: int
+    columns_number: int,
+    rows_number: int,
+    max_dice_value: int,
+    depth: int,
+    agent: MCTS | None = None,
+    algorithm: str = "negamax",
 ) -> int:
-    """Human plays against the negamax agent. The human plays first or second randomly."""
+    """Human plays against the Python search with `algorithm`, or `agent` if given. The
+    human plays first or second randomly. The exact algorithms use the endgame tablebase
+    if there is one."""
     game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
     player_index = random.randint(0, 1)
     turn_counter = 0
 
-    tt = load_tt("tt.pkl")
+    evaluator = load_evaluator()
+    tt = load_tt(
+        TT_FILENAME,
+        columns_number,
+        rows_number,
+        max_dice_value,
+        evaluator=evaluator,
+        algorithm=algorithm,
+    )
+    book = load_opening_book(columns_number, rows_number, max_dice_value)
+    tablebase = None
+    if algorithm != "negamax":
+        tablebase = load_tablebase(columns_number, rows_number, max_dice_value)
     while not game.is_game_over():
         print(f"dice number: {game.get_dice_value()}")
         print(game.display_board(0))
@@ -73,8 +137,19 @@ def play_against_negamax(
             if not game.make_move(move):
                 print("Invalid move")
                 continue
+        elif agent is not None:
+            best_move, _ = agent.get_best_move(game)
+            game.make_move(best_move)
         else:
-            best_move, _ = get_best_move(game=game, depth=depth, tt=tt)
+            best_move, _ = get_best_move(
+                game=game,
+                depth=depth,
+                tt=tt,
+                algorithm=algorithm,
+                tablebase=tablebase,
+                book=book,
+                evaluator=evaluator,
+            )
             game.make_move(best_move)
         player_index = 1 - player_index
         turn_counter += 1
@@ -88,16 +163,151 @@ def play_against_negamax(
 
     print(f"Player {player_index} wins")
 
-    save_tt(tt, "tt.pkl")
+    save_tt(tt)
+
+
+def cross_check_native_search(
+    columns_number: int, rows_number: int, max_dice_value: int, depth: int, games: int
+) -> bool:
+    """Compare the native search with the Python reference on every position of random games."""
+    all_match = True
+    for _ in range(games):
+        game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
+        while not game.is_game_over():
+            python_move, python_score = get_best_move(game=game, depth=depth, tt={})
+            native_move, native_score, nodes = game.best_move(depth)
+            if python_move != native_move or abs(python_score - native_score) > 1e-9:
+                all_match = False
+                print(
+                    f"Mismatch on {game.encode_game()}: python ({python_move}, {python_score:.4f}), native ({native_move}, {native_score:.4f})"
+                )
+            game.make_move(random.choice(game.get_available_columns(game.get_current_player())))
+
+    print(f"Native search {'matches' if all_match else 'does not match'} the reference")
+    return all_match
+
+
+def compare_chance_pruning(
+    columns_number: int, rows_number: int, max_dice_value: int, depth: int, games: int
+) -> dict:
+    """Run the native expectimax search with and without Star1/Star2 pruning on every
+    position of random games, check that the moves and values are the same and report the
+    number of nodes each one visited."""
+    algorithms = ("expectimax", "star1", "star2")
+    nodes = dict.fromkeys(algorithms, 0)
+    all_match = True
+    for _ in range(games):
+        game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
+        while not game.is_game_over():
+            results = {
+                algorithm: game.best_move(depth, algorithm=algorithm)
+                for algorithm in algorithms
+            }
+            for algorithm, (move, value, visited) in results.items():
+                nodes[algorithm] += visited
+                if (move, value) != results["expectimax"][:2]:
+                    all_match = False
+                    print(
+                        f"Mismatch on {game.encode_game()}: {algorithm} ({move}, {value}), expectimax {results['expectimax'][:2]}"
+                    )
+            game.make_move(random.choice(game.get_available_columns(game.get_current_player())))
+
+    for algorithm in algorithms:
+        saved = 1 - nodes[algorithm] / max(nodes["expectimax"], 1)
+        print(f"{algorithm}: {nodes[algorithm]} nodes ({saved:.1%} saved)")
+    print(f"Pruned values {'match' if all_match else 'do not match'} the unpruned expectimax")
+    return nodes
+
+
+def compare_move_ordering(
+    columns_number: int,
+    rows_number: int,
+    max_dice_value: int,
+    depth: int,
+    games: int,
+    algorithm: str = "star2",
+) -> dict:
+    """Run the Python search with and without move ordering on every position of random
+    games and report the number of nodes each one visited, from its SearchStats."""
+    nodes = {False: 0, True: 0}
+    same_moves = positions = 0
+    for _ in range(games):
+        game = kb.Knucklebones(columns_number, rows_number, max_dice_value)
+        while not game.is_game_over():
+            moves = {}
+            for move_ordering in (False, True):
+                stats = SearchStats()
+                moves[move_ordering], _ = get_best_move(
+                    game,
+                    depth,
+                    {},
+                    algorithm=algorithm,
+                    stats=stats,
+                    move_ordering=move_ordering,
+                )
+                nodes[move_ordering] += stats.total_nodes()
+            same_moves += moves[False] == moves[True]
+            positions += 1
+            game.make_move(random.choice(game.get_available_columns(game.get_current_player())))
+
+    saved = 1 - nodes[True] / max(nodes[False], 1)
+    print(f"Without ordering: {nodes[False]} nodes")
+    print(f"With ordering: {nodes[True]} nodes ({saved:.1%} saved)")
+    print(f"Same move on {same_moves}/{positions} positions")
+    return {"unordered": nodes[False], "ordered": nodes[True]}
+
+
+def save_tt(tt: TranspositionTable) -> None:
+    """Append the entries stored since the table was loaded to its file."""
+    tt.flush()
+
+
+def load_tt(
+    filename: str,
+    columns_number: int,
+    rows_number: int,
+    max_dice_value: int,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    evaluator: Evaluator | None = None,
+    algorithm: str = "negamax",
+) -> TranspositionTable:
+    """Open the table file, converting the legacy pickle the first time, behind a bounded table.
+
+    The file holds negamax values for the score difference, so for another `algorithm`
+    or an `evaluator` other than the score difference the table is kept in memory only.
+    """
+    if algorithm != "negamax" or (
+        evaluator is not None and not evaluator.is_score_only()
+    ):
+        return TranspositionTable(memory_budget)
+    if not os.path.exists(filename) and os.path.exists(LEGACY_TT_FILENAME):
+        convert_pickle_tt(
+            LEGACY_TT_FILENAME, filename, columns_number, rows_number, max_dice_value
+        )
+    tt_file = TTFile(filename, columns_number, rows_number, max_dice_value)
+    return TranspositionTable(memory_budget, backing=tt_file)
+
+
+def load_tablebase(
+    columns_number: int, rows_number: int, max_dice_value: int
+) -> Tablebase | None:
+    """Endgame tablebase built by `python -m src.tablebase`, if there is one."""
+    if not os.path.exists(TABLEBASE_FILENAME):
+        return None
+    return Tablebase(TABLEBASE_FILENAME, columns_number, rows_number, max_dice_value)
 
 
-def save_tt(tt: dict, filename: str) -> None:
-    with open(filename, "wb") as f:
-        pickle.dump(tt, f)
+def load_opening_book(
+    columns_number: int, rows_number: int, max_dice_value: int
+) -> OpeningBook | None:
+    """Opening book built by `python -m src.opening_book`, if there is one."""
+    if not os.path.exists(OPENING_BOOK_FILENAME):
+        return None
+    return OpeningBook(OPENING_BOOK_FILENAME, columns_number, rows_number, max_dice_value)
 
 
-def load_tt(filename: str) -> dict:
-    if not os.path.exists(filename):
-        return {}
-    with open(filename, "rb") as f:
-        return pickle.load(f)
+def load_evaluator() -> Evaluator | None:
+    """Evaluator with the weights of `evaluation.json`, if there is one."""
+    if not os.path.exists(EVALUATION_FILENAME):
+        return None
+    return Evaluator.load(EVALUATION_FILENAME)